@@ -1,6 +1,18 @@
+import cProfile
+import io
+import os
+import pstats
 import random
+import time
+import threading
+import tracemalloc
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 import numpy as np
 import game_logic as gl 
+import opening_book as ob
+import solver as sv
 
 def evaluate_window(window, piece):
     score = 0
@@ -48,36 +60,376 @@ def score_position(board, piece):
             
     return score
 
-def minimax(board, depth, alpha, beta, maximizingPlayer):
-    valid_locations = gl.get_valid_locations(board)
-    
-    center_preferred_order = [3, 2, 4, 1, 5, 0, 6]
-    
-    valid_locations = [col for col in center_preferred_order if col in valid_locations]
+# Ogni finestra viene codificata in base 3 (cella+1) con un unico prodotto matriciale;
+# il punteggio di ogni codice è precalcolato con evaluate_window
+_WINDOW_WEIGHTS = 3 ** np.arange(4)
 
-    is_terminal = gl.winning_move(board, gl.PLAYER_PIECE) or gl.winning_move(board, gl.AI_PIECE) or len(valid_locations) == 0
-    
-    if depth == 0 or is_terminal:
-        if is_terminal:
-            if gl.winning_move(board, gl.AI_PIECE):
-                return (None, 100000000000000 + depth) # Vittoria certa
-            elif gl.winning_move(board, gl.PLAYER_PIECE):
-                return (None, -10000000000000 - depth) # Sconfitta certa
-            else: # Pareggio
-                return (None, 0)
-        else: # Profondità 0, usa l'euristica
-            return (None, score_position(board, gl.AI_PIECE))
+def _window_score_table(piece):
+    table = np.zeros(3**4, dtype=np.int64)
+    for code in range(3**4):
+        window = [(code // 3**i) % 3 - 1 for i in range(4)]
+        table[code] = evaluate_window(window, piece)
+    return table
+
+_WINDOW_SCORES = {piece: _window_score_table(piece) for piece in (gl.PLAYER_PIECE, gl.AI_PIECE)}
+
+def score_positions(boards, piece, window_index=gl.WINDOW_INDEX):
+    """Versione vettoriale di score_position su uno stack (N, 6, 7): restituisce N punteggi.
+    Serve dove le board sono già matrici in blocco (es. il test set in analysis_mlp.py);
+    la ricerca usa invece la valutazione incrementale di EvalPosition."""
+    boards = np.asarray(boards, dtype=np.float64).reshape(-1, gl.ROW_COUNT, gl.COLUMN_COUNT)
+
+    code_matrix = np.zeros((gl.ROW_COUNT * gl.COLUMN_COUNT, len(window_index)))
+    code_matrix[window_index, np.arange(len(window_index))[:, None]] = _WINDOW_WEIGHTS
+    codes = (boards.reshape(len(boards), -1) @ code_matrix).astype(np.int64) + _WINDOW_WEIGHTS.sum()
+
+    scores = _WINDOW_SCORES[piece][codes].sum(axis=1)
+    scores += (boards[:, :, gl.COLUMN_COUNT//2] == piece).sum(axis=1) * 3
+    return scores
+
+def score_bitboard(bb_piece, bb_opp, window_masks=gl.WINDOW_MASKS):
+    # Stessa euristica di score_position, con i conteggi delle finestre via popcount
+    score = gl.popcount(bb_piece & gl.CENTER_MASK) * 3
+
+    for mask in window_masks:
+        own = gl.popcount(bb_piece & mask)
+        opp = gl.popcount(bb_opp & mask)
+        if own == 4:
+            score += 100
+        elif own == 3 and opp == 0:
+            score += 5
+        elif own == 2 and opp == 0:
+            score += 2
+
+        if opp == 3 and own == 0:
+            score -= 4
+
+    return score
+
+# --- Valutazione incrementale ---
+# Per ogni finestra si tiene il codice own*5 + opp (pedine di chi valuta e dell'avversario):
+# una mossa tocca al più 16 finestre, quindi il punteggio viene aggiornato in play/undo
+# invece di ricalcolare tutte le 69 finestre alle foglie.
+def _window_code_scores():
+    table = [0] * 25
+    for own in range(5):
+        for opp in range(5 - own):
+            table[own*5 + opp] = score_bitboard(sum(1 << i for i in range(own)),
+                                                sum(1 << i for i in range(own, own + opp)), [(1 << 4) - 1])
+    return table
+
+_CODE_SCORES = _window_code_scores()
+_OWN_DELTA = [_CODE_SCORES[c + 5] - _CODE_SCORES[c] if c + 5 < 25 else 0 for c in range(25)]
+_OPP_DELTA = [_CODE_SCORES[c + 1] - _CODE_SCORES[c] if c + 1 < 25 else 0 for c in range(25)]
+_CELL_WINDOWS = {} # numero di finestre considerate -> finestre che contengono ogni bit
+
+def _cell_windows(window_count):
+    if window_count not in _CELL_WINDOWS:
+        cells = [[] for _ in range(gl.COLUMN_COUNT * gl.BB_HEIGHT)]
+        for w, window in enumerate(gl.WINDOWS[:window_count]):
+            for r, c in window:
+                cells[c * gl.BB_HEIGHT + r].append(w)
+        _CELL_WINDOWS[window_count] = cells
+    return _CELL_WINDOWS[window_count]
+
+class EvalPosition(gl.Position):
+    """gl.Position che mantiene il punteggio euristico di piece (score_bitboard) durante
+    play/undo. window_count limita la valutazione alle prime finestre di gl.WINDOWS
+    (es. gl.ROW_WINDOW_COUNT per le sole orizzontali)."""
+
+    __slots__ = ('piece', 'codes', 'score', 'cell_windows')
+
+    def __init__(self, bb_player=0, bb_ai=0, heights=None, ai_to_move=True, piece=gl.AI_PIECE,
+                 window_count=len(gl.WINDOWS)):
+        super().__init__(bb_player, bb_ai, heights, ai_to_move)
+        self.piece = piece
+        self.cell_windows = _cell_windows(window_count)
+        own, opp = (bb_ai, bb_player) if piece == gl.AI_PIECE else (bb_player, bb_ai)
+        self.codes = [gl.popcount(own & m) * 5 + gl.popcount(opp & m) for m in gl.WINDOW_MASKS[:window_count]]
+        self.score = score_bitboard(own, opp, gl.WINDOW_MASKS[:window_count])
+
+    @classmethod
+    def from_board(cls, board, ai_to_move=True, piece=gl.AI_PIECE, window_count=len(gl.WINDOWS)):
+        bb_player, bb_ai, heights = gl.board_to_bitboard(board)
+        return cls(bb_player, bb_ai, heights, ai_to_move, piece, window_count)
+
+    def play(self, col, piece):
+        index = col * gl.BB_HEIGHT + self.heights[col]
+        codes = self.codes
+        score = self.score
+        if piece == self.piece:
+            for w in self.cell_windows[index]:
+                code = codes[w]
+                score += _OWN_DELTA[code]
+                codes[w] = code + 5
+            if col == gl.COLUMN_COUNT // 2:
+                score += 3
+        else:
+            for w in self.cell_windows[index]:
+                code = codes[w]
+                score += _OPP_DELTA[code]
+                codes[w] = code + 1
+        self.score = score
+        return gl.Position.play(self, col, piece)
+
+    def undo(self):
+        col = self.moves[-1]
+        index = col * gl.BB_HEIGHT + self.heights[col] - 1
+        codes = self.codes
+        score = self.score
+        if (self.bb_ai if self.piece == gl.AI_PIECE else self.bb_player) >> index & 1:
+            for w in self.cell_windows[index]:
+                code = codes[w] - 5
+                score -= _OWN_DELTA[code]
+                codes[w] = code
+            if col == gl.COLUMN_COUNT // 2:
+                score -= 3
+        else:
+            for w in self.cell_windows[index]:
+                code = codes[w] - 1
+                score -= _OPP_DELTA[code]
+                codes[w] = code
+        self.score = score
+        return gl.Position.undo(self)
+
+# --- Transposition Table ---
+# Indicizzata con l'hash Zobrist incrementale mantenuto da gl.Position
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+class TranspositionTable:
+    """Tabella a dimensione fissa (size_mb) con sostituzione depth-preferred"""
+
+    ENTRY_BYTES = 128 # Stima: slot della lista + tupla (key, depth, flag, value, move)
+
+    def __init__(self, size_mb=32):
+        self.size = max(1, size_mb * 2**20 // self.ENTRY_BYTES)
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        # Le voci delle ricerche precedenti restano valide ma diventano sostituibili
+        self.generation += 1
+
+    def probe(self, key):
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        idx = key % self.size
+        old = self.entries[idx]
+        if old is None or old[0] == key or old[5] != self.generation or depth >= old[1]:
+            self.entries[idx] = (key, depth, flag, value, move, self.generation)
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+CENTER_PREFERRED_ORDER = [3, 2, 4, 1, 5, 0, 6]
+
+class MoveOrdering:
+    """Ordinamento dinamico delle mosse: vittorie immediate, blocchi, mossa della tabella,
+    killer move per ply e history heuristic. A parità resta l'ordine centro-prima."""
+
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(gl.ROW_COUNT * gl.COLUMN_COUNT + 1)]
+        self.history = [[0] * (gl.COLUMN_COUNT * gl.BB_HEIGHT) for _ in range(2)] # [giocatore, AI][cella]
+
+    def order(self, pos, valid_locations, piece, tt_move=None):
+        if piece == gl.AI_PIECE:
+            own, opp = pos.bb_ai, pos.bb_player
+        else:
+            own, opp = pos.bb_player, pos.bb_ai
+        mask = own | opp
+        wins = gl.bb_winning_cells(own, mask)
+        blocks = gl.bb_winning_cells(opp, mask)
+        killer_1, killer_2 = self.killers[len(pos.moves)]
+        history = self.history[piece == gl.AI_PIECE]
+        heights = pos.heights
+
+        def priority(col):
+            cell = col * gl.BB_HEIGHT + heights[col]
+            if wins >> cell & 1:
+                return (5, 0)
+            if blocks >> cell & 1:
+                return (4, 0)
+            if col == tt_move:
+                return (3, 0)
+            if col == killer_1:
+                return (2, 0)
+            if col == killer_2:
+                return (1, 0)
+            return (0, history[cell])
+
+        # sorted è stabile: a parità di priorità si mantiene l'ordine di partenza
+        return sorted(valid_locations, key=priority, reverse=True)
+
+    def cutoff(self, pos, col, depth, piece):
+        # Chiamata con la mossa già annullata: heights[col] è la cella in cui è stata giocata
+        killers = self.killers[len(pos.moves)]
+        if killers[0] != col:
+            killers[1] = killers[0]
+            killers[0] = col
+        self.history[piece == gl.AI_PIECE][col * gl.BB_HEIGHT + pos.heights[col]] += depth * depth
+
+AI_WIN_SCORE = 100000000000000 # Vittoria certa
+PLAYER_WIN_SCORE = -10000000000000 # Sconfitta certa
+
+class SearchTimeout(Exception):
+    """Sollevata quando la ricerca supera la deadline e va interrotta"""
+
+class SearchStats:
+    """Contatori di una ricerca: nodi visitati, valutazioni euristiche, tagli alpha-beta"""
+
+    def __init__(self):
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.max_depth = 0
+        self.elapsed = 0.0
+        self.source = "search" # "search", "book", "solver" oppure "ponder"
+        self.profile = None # Report di cProfile (testo), se richiesto
+        self.peak_memory = None # Picco di memoria in byte (tracemalloc), se richiesto
+
+    def merge(self, other):
+        # Somma i contatori di una ricerca parziale (es. di un processo del pool)
+        self.nodes += other.nodes
+        self.leaves += other.leaves
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+    def first_move_cutoff_ratio(self):
+        # Quota dei tagli avvenuti sulla prima mossa provata: misura la qualità dell'ordinamento
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {"nodes": self.nodes, "leaves": self.leaves, "cutoffs": self.cutoffs,
+                "first_move_cutoff_ratio": round(self.first_move_cutoff_ratio(), 4),
+                "max_depth": self.max_depth, "elapsed": round(self.elapsed, 6),
+                "nodes_per_second": round(self.nodes_per_second(), 1), "source": self.source,
+                "peak_memory": self.peak_memory}
+
+@contextmanager
+def profile_search(stats, cprofile=False, memory=False):
+    """Profilazione opzionale di una ricerca: il report cProfile e il picco di memoria
+    misurato con tracemalloc vengono salvati in stats"""
+    profiler = None
+    started_tracing = False
+    if cprofile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    try:
+        yield stats
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            stats.profile = out.getvalue()
+        if started_tracing:
+            stats.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+def minimax(board, depth, alpha, beta, maximizingPlayer, tt=None, stats=None, ordering=None):
+    start = time.perf_counter()
+    pos = EvalPosition.from_board(board, maximizingPlayer)
+
+    # Controllo completo solo alla radice: nei nodi interni basta verificare l'ultima mossa
+    if gl.bb_winning_move(pos.bb_ai):
+        return (None, AI_WIN_SCORE + depth)
+    elif gl.bb_winning_move(pos.bb_player):
+        return (None, PLAYER_WIN_SCORE - depth)
+
+    if tt is not None:
+        tt.new_search()
+    result = _minimax_pos(pos, depth, alpha, beta, maximizingPlayer, tt, None, stats, ordering)
+    if stats is not None:
+        stats.elapsed += time.perf_counter() - start
+    return result
+
+def _minimax_pos(pos, depth, alpha, beta, maximizingPlayer, tt=None, deadline=None, stats=None, ordering=None,
+                 should_stop=None):
+    heights = pos.heights
+    valid_locations = [col for col in CENTER_PREFERRED_ORDER if heights[col] < gl.ROW_COUNT]
+
+    if stats is not None:
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, len(pos.moves))
+
+    if len(valid_locations) == 0: # Pareggio
+        return (None, 0)
+    if depth == 0: # Profondità 0, usa l'euristica
+        if stats is not None:
+            stats.leaves += 1
+        return (None, pos.score)
+    if deadline is not None and (time.perf_counter() > deadline or (should_stop is not None and should_stop())):
+        raise SearchTimeout()
+
+    alpha_orig, beta_orig = alpha, beta
+    entry_move = None
+    if tt is not None:
+        key = pos.key
+        entry = tt.probe(key)
+        if entry is not None:
+            _, entry_depth, flag, entry_value, entry_move, _ = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return entry_move, entry_value
+                elif flag == LOWER_BOUND:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    return entry_move, entry_value
+            # La mossa migliore memorizzata viene provata per prima
+            if ordering is None:
+                valid_locations.remove(entry_move)
+                valid_locations.insert(0, entry_move)
+
+    # Alla frontiera i figli sono valutati tutti insieme: l'ordine non cambia il costo
+    if ordering is not None and depth > 1:
+        valid_locations = ordering.order(pos, valid_locations, gl.AI_PIECE if maximizingPlayer else gl.PLAYER_PIECE, entry_move)
+
+    if depth == 1: # Nodo di frontiera: tutti i figli valutati con una sola chiamata vettoriale
+        if maximizingPlayer:
+            frontier = frontier_scores(pos, valid_locations, gl.AI_PIECE, AI_WIN_SCORE, stats=stats)
+        else:
+            frontier = frontier_scores(pos, valid_locations, gl.PLAYER_PIECE, PLAYER_WIN_SCORE, stats=stats)
 
     if maximizingPlayer: # Turno AI
         value = -float('inf')
         column = valid_locations[0] 
         
-        for col in valid_locations:
-            row = gl.get_next_open_row(board, col)
-            b_copy = board.copy()
-            gl.drop_piece(b_copy, row, col, gl.AI_PIECE)
-            
-            new_score = minimax(b_copy, depth-1, alpha, beta, False)[1]
+        for i, col in enumerate(valid_locations):
+            if depth == 1:
+                new_score = frontier[col]
+            else:
+                if pos.play(col, gl.AI_PIECE):
+                    new_score = AI_WIN_SCORE + depth - 1
+                    if stats is not None:
+                        stats.nodes += 1
+                else:
+                    new_score = _minimax_pos(pos, depth-1, alpha, beta, False, tt, deadline, stats, ordering,
+                                             should_stop)[1]
+                pos.undo()
             
             if new_score > value:
                 value = new_score
@@ -86,20 +438,29 @@ def minimax(board, depth, alpha, beta, maximizingPlayer):
             # Alpha-Beta Pruning
             alpha = max(alpha, value)
             if alpha >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                    stats.first_move_cutoffs += i == 0
+                if ordering is not None and depth > 1:
+                    ordering.cutoff(pos, col, depth, gl.AI_PIECE)
                 break # Taglio del ramo (Beta Cutoff)
-                
-        return column, value
 
     else: # Turno Giocatore (Minimizing)
         value = float('inf')
         column = valid_locations[0]
         
-        for col in valid_locations:
-            row = gl.get_next_open_row(board, col)
-            b_copy = board.copy()
-            gl.drop_piece(b_copy, row, col, gl.PLAYER_PIECE)
-            
-            new_score = minimax(b_copy, depth-1, alpha, beta, True)[1]
+        for i, col in enumerate(valid_locations):
+            if depth == 1:
+                new_score = frontier[col]
+            else:
+                if pos.play(col, gl.PLAYER_PIECE):
+                    new_score = PLAYER_WIN_SCORE - depth + 1
+                    if stats is not None:
+                        stats.nodes += 1
+                else:
+                    new_score = _minimax_pos(pos, depth-1, alpha, beta, True, tt, deadline, stats, ordering,
+                                             should_stop)[1]
+                pos.undo()
             
             if new_score < value:
                 value = new_score
@@ -108,50 +469,307 @@ def minimax(board, depth, alpha, beta, maximizingPlayer):
             # Alpha-Beta Pruning
             beta = min(beta, value)
             if alpha >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                    stats.first_move_cutoffs += i == 0
+                if ordering is not None and depth > 1:
+                    ordering.cutoff(pos, col, depth, gl.PLAYER_PIECE)
                 break # Taglio del ramo (Alpha Cutoff)
-                
-        return column, value
 
-def get_neural_move(model, board):
-    valid_locations = gl.get_valid_locations(board)
+    if tt is not None:
+        if value <= alpha_orig:
+            flag = UPPER_BOUND
+        elif value >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        tt.store(key, depth, flag, value, column)
+
+    return column, value
+
+def frontier_scores(pos, valid_locations, mover, win_score, stats=None):
+    # Punteggi dei figli a profondità 0 dopo la mossa di mover: vittorie e pareggi come
+    # nei nodi terminali, tutti gli altri letti dalla valutazione incrementale dell'EvalPosition
+    # (con il pezzo e le finestre scelti alla sua creazione)
+    scores = {}
+    leaves = 0
+    board_full_after_move = pos.empty_cells() == 1
 
     for col in valid_locations:
-        row = gl.get_next_open_row(board, col)
-        temp_board = board.copy()
-        gl.drop_piece(temp_board, row, col, gl.AI_PIECE)
-        if gl.winning_move(temp_board, gl.AI_PIECE):
-            return col 
-            
-    for col in valid_locations:
-        row = gl.get_next_open_row(board, col)
-        temp_board = board.copy()
-        gl.drop_piece(temp_board, row, col, gl.PLAYER_PIECE)
-        if gl.winning_move(temp_board, gl.PLAYER_PIECE):
-            return col 
-
-    best_score = -100
-    best_col = random.choice(valid_locations)
-    
-    random.shuffle(valid_locations) 
-    
+        if pos.play(col, mover):
+            scores[col] = win_score
+        elif board_full_after_move:
+            scores[col] = 0
+        else:
+            scores[col] = pos.score
+            leaves += 1
+        pos.undo()
+
+    if stats is not None:
+        stats.nodes += len(valid_locations)
+        stats.leaves += leaves
+        stats.max_depth = max(stats.max_depth, len(pos.moves) + 1)
+    return scores
+
+def iterative_deepening(board, time_budget, max_depth=None, tt=None, maximizingPlayer=True, stats=None, ordering=None,
+                        should_stop=None):
+    """Minimax a profondità crescente entro time_budget secondi, o finché should_stop()
+    non restituisce True. Restituisce (colonna, valore, profondità completata)."""
+    start = time.perf_counter()
+    deadline = start + time_budget
+    pos = EvalPosition.from_board(board, maximizingPlayer)
+
+    if gl.bb_winning_move(pos.bb_ai):
+        return (None, AI_WIN_SCORE, 0)
+    elif gl.bb_winning_move(pos.bb_player):
+        return (None, PLAYER_WIN_SCORE, 0)
+
+    if max_depth is None or max_depth > pos.empty_cells():
+        max_depth = pos.empty_cells()
+
+    # La tabella porta la variante principale di un'iterazione come ordinamento della successiva
+    if tt is None:
+        tt = TranspositionTable(8)
+    tt.new_search()
+
+    column, value, completed = None, 0, 0
+    for depth in range(1, max_depth + 1):
+        try:
+            # La profondità 1 viene sempre completata per avere comunque una mossa
+            column, value = _minimax_pos(pos, depth, -float('inf'), float('inf'),
+                                         maximizingPlayer, tt, deadline if depth > 1 else None, stats, ordering,
+                                         should_stop)
+        except SearchTimeout:
+            break
+        completed = depth
+        if value >= AI_WIN_SCORE or value <= PLAYER_WIN_SCORE: # Esito già deciso
+            break
+        if time.perf_counter() > deadline or (should_stop is not None and should_stop()):
+            break
+
+    if stats is not None:
+        stats.elapsed += time.perf_counter() - start
+    return column, value, completed
+
+def principal_variation(board, tt, maximizingPlayer=True, max_length=None):
+    # Ricostruisce la variante principale seguendo le mosse migliori nella tabella
+    pos = gl.Position.from_board(board, maximizingPlayer)
+    pv = []
+    while max_length is None or len(pv) < max_length:
+        entry = tt.entries[pos.key % tt.size]
+        if entry is None or entry[0] != pos.key or entry[4] is None:
+            break
+        col = entry[4]
+        pv.append(col)
+        if pos.play(col, gl.AI_PIECE if maximizingPlayer else gl.PLAYER_PIECE):
+            break
+        maximizingPlayer = not maximizingPlayer
+    return pv
+
+# Con al più questo numero di celle vuote il risolutore esatto sostituisce la ricerca euristica
+SOLVER_EMPTY_CELLS = 18
+
+def get_minimax_move(board, think_time=None, depth=None, workers=None, tt=None, book=None, stats=None,
+                     dynamic_ordering=True, solver_threshold=SOLVER_EMPTY_CELLS, should_stop=None):
+    """Mossa del motore Minimax: prima il libro delle aperture, nel finale il risolutore esatto,
+    altrimenti la ricerca (a tempo con think_time, o a profondità fissa su workers processi).
+    Con think_time e depth insieme la ricerca a tempo si ferma comunque a depth; should_stop
+    interrompe in anticipo la ricerca a tempo (il risolutore non è interrompibile).
+    solver_threshold=0 disattiva il risolutore."""
+    if book is None:
+        book = ob.default_book()
+    col = book.lookup(board)
+    if col is not None and gl.is_valid_location(board, col):
+        if stats is not None:
+            stats.source = "book"
+        return col
+
+    if int(np.count_nonzero(board == gl.EMPTY)) <= solver_threshold:
+        col, _ = sv.solver_move(board, gl.AI_PIECE, sv.default_solver(), stats)
+        return col
+
+    if think_time is not None:
+        ordering = MoveOrdering() if dynamic_ordering else None
+        col, _, _ = iterative_deepening(board, think_time, max_depth=depth, tt=tt, stats=stats, ordering=ordering,
+                                        should_stop=should_stop)
+    else:
+        col, _ = parallel_minimax(board, depth, workers=workers, stats=stats, dynamic_ordering=dynamic_ordering)
+    return col
+
+# --- Ricerca parallela alla radice ---
+# Ogni mossa della radice viene cercata da un processo diverso; il miglior valore trovato
+# finora (alpha) è condiviso tra i processi e restringe la finestra delle mosse successive.
+# Pool e alpha sono condivisi da tutti i thread del processo (es. le sessioni dell'app):
+# ogni ricerca usa una propria casella di _shared_alpha e al più workers processi del pool,
+# che viene creato una sola volta con tutti i core.
+SEARCH_SLOTS = 64 # Ricerche parallele contemporanee
+_pool = None
+_pool_lock = threading.Lock()
+_shared_alpha = None
+_free_slots = list(range(SEARCH_SLOTS))
+_slots_available = threading.Semaphore(SEARCH_SLOTS)
+
+def _init_search_worker(shared_alpha):
+    global _shared_alpha
+    _shared_alpha = shared_alpha
+
+def _search_root_move(bb_player, bb_ai, heights, col, depth, dynamic_ordering=False, slot=0):
+    stats = SearchStats()
+    pos = EvalPosition(bb_player, bb_ai, heights)
+    if pos.play(col, gl.AI_PIECE):
+        stats.nodes = 1
+        return col, AI_WIN_SCORE + depth - 1, stats
+
+    # Finestra (alpha-1, +inf): una mossa che eguaglia la migliore riceve comunque un valore
+    # esatto, così la scelta tra mosse equivalenti è la stessa della ricerca seriale
+    alpha = _shared_alpha[slot] - 1
+    ordering = MoveOrdering() if dynamic_ordering else None
+    value = _minimax_pos(pos, depth-1, alpha, float('inf'), False, stats=stats, ordering=ordering)[1]
+    with _shared_alpha.get_lock():
+        if value > _shared_alpha[slot]:
+            _shared_alpha[slot] = value
+    return col, value, stats
+
+def _get_pool():
+    global _pool, _shared_alpha
+    with _pool_lock:
+        if _pool is None:
+            _shared_alpha = multiprocessing.Array('d', SEARCH_SLOTS)
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, initializer=_init_search_worker,
+                                        initargs=(_shared_alpha,))
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+@contextmanager
+def _search_slot():
+    # Casella di _shared_alpha riservata a una ricerca per tutta la sua durata
+    _slots_available.acquire()
+    with _pool_lock:
+        slot = _free_slots.pop()
+    try:
+        yield slot
+    finally:
+        with _pool_lock:
+            _free_slots.append(slot)
+        _slots_available.release()
+
+def parallel_minimax(board, depth, workers=None, stats=None, dynamic_ordering=False):
+    """Come minimax(board, depth, -inf, inf, True) ma con le mosse della radice distribuite
+    su un pool di processi, al più workers alla volta. Restituisce la stessa (colonna, valore)
+    della versione seriale, anche con più ricerche contemporanee da thread diversi.
+    Con dynamic_ordering ogni processo ordina i nodi interni con MoveOrdering: i valori
+    non cambiano, la radice resta in ordine centro-prima."""
+    start = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pos = gl.Position.from_board(board)
+
+    if gl.bb_winning_move(pos.bb_ai):
+        return (None, AI_WIN_SCORE + depth)
+    elif gl.bb_winning_move(pos.bb_player):
+        return (None, PLAYER_WIN_SCORE - depth)
+
+    valid_locations = [col for col in CENTER_PREFERRED_ORDER if pos.can_play(col)]
+    if len(valid_locations) == 0:
+        return (None, 0)
+    if depth == 0:
+        return (None, score_bitboard(pos.bb_ai, pos.bb_player))
+
+    pool = _get_pool()
+    results = {}
+    with _search_slot() as slot:
+        _shared_alpha[slot] = -float('inf')
+        # Le mosse vengono inviate in ordine centro-prima, senza superare workers in esecuzione
+        pending = list(reversed(valid_locations))
+        running = set()
+        while pending or running:
+            while pending and len(running) < workers:
+                running.add(pool.submit(_search_root_move, pos.bb_player, pos.bb_ai, pos.heights,
+                                        pending.pop(), depth, dynamic_ordering, slot))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                col, value, move_stats = future.result()
+                results[col] = value
+                if stats is not None:
+                    stats.merge(move_stats)
+    if stats is not None:
+        stats.nodes += 1 # La radice
+        stats.elapsed += time.perf_counter() - start
+
+    # Stesso criterio della ricerca seriale: vince la prima colonna con valore strettamente maggiore
+    column, value = valid_locations[0], -float('inf')
     for col in valid_locations:
-        row = gl.get_next_open_row(board, col)
-        temp_board = board.copy()
-        gl.drop_piece(temp_board, row, col, gl.AI_PIECE)
-        
-        flat_board = temp_board.flatten().reshape(1, -1)
-        prediction = model.predict(flat_board)[0]
-        
-        score = 0
-        if prediction == 1: score = -50    # Vince P1 (Male per AI)
-        elif prediction == 0: score = 0    # Pareggio (Neutro)
-        elif prediction == -1: score = 100 # Vince AI (Ottimo)
-        
-        if col == 3: score += 5
-        elif col == 2 or col == 4: score += 2
+        if results[col] > value:
+            column, value = col, results[col]
+    return column, value
+
+def _forced_move(board, valid_locations):
+    # Vittoria immediata dell'AI, altrimenti blocco della vittoria immediata del giocatore
+    temp_board = board.copy()
+    for piece in (gl.AI_PIECE, gl.PLAYER_PIECE):
+        for col in valid_locations:
+            row = gl.get_next_open_row(temp_board, col)
+            gl.drop_piece(temp_board, row, col, piece)
+            won = gl.winning_move_at(temp_board, row, col)
+            gl.drop_piece(temp_board, row, col, gl.EMPTY)
+            if won:
+                return col
+    return None
+
+def get_neural_move(model, board):
+    return get_neural_moves(model, [board])[0]
+
+def get_neural_moves(model, boards):
+    """Mossa MLP per più partite: tutte le board candidate passano in un'unica predict"""
+    moves = [None] * len(boards)
+    orders = {}
+    candidates = []
+
+    for i, board in enumerate(boards):
+        valid_locations = gl.get_valid_locations(board)
+        forced = _forced_move(board, valid_locations)
+        if forced is not None:
+            moves[i] = forced
+            continue
+
+        moves[i] = random.choice(valid_locations)
+        random.shuffle(valid_locations) 
+        orders[i] = valid_locations
+
+        flat_board = np.asarray(board, dtype=np.float64).flatten()
+        for col in valid_locations:
+            row = gl.get_next_open_row(board, col)
+            candidate = flat_board.copy()
+            candidate[row * gl.COLUMN_COUNT + col] = gl.AI_PIECE
+            candidates.append(candidate)
+
+    if not candidates:
+        return moves
+    predictions = model.predict(np.array(candidates)).tolist()
+
+    k = 0
+    for i, valid_locations in orders.items():
+        best_score = -100
+        for col in valid_locations:
+            prediction = predictions[k]
+            k += 1
+            
+            score = 0
+            if prediction == 1: score = -50    # Vince P1 (Male per AI)
+            elif prediction == 0: score = 0    # Pareggio (Neutro)
+            elif prediction == -1: score = 100 # Vince AI (Ottimo)
+            
+            if col == 3: score += 5
+            elif col == 2 or col == 4: score += 2
 
-        if score > best_score:
-            best_score = score
-            best_col = col
+            if score > best_score:
+                best_score = score
+                moves[i] = col
             
-    return best_col
\ No newline at end of file
+    return moves
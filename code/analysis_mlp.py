@@ -1,38 +1,94 @@
-import pandas as pd
+import argparse
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, ConfusionMatrixDisplay
 
-def run_analysis():
+import game_logic as gl
+import ai_engines as ai
+import dataset_io as dio
+import model_store as ms
+
+LABELS = [(-1, 'AI Wins'), (0, 'Draw'), (1, 'Player Wins')]
+
+def train_in_memory(X, y):
+    # Split 80/20 e addestramento con la configurazione condivisa con l'app
+    mlp, X_train, X_test, y_train, y_test = ms.train(X, y)
+    print(f"Training su {len(X_train)} campioni, Test su {len(X_test)} campioni.")
+
+    # Artefatto versionato: l'app lo carica senza riaddestrare
+    key = ms.artifact_key(dio.DATASET_PATH)
+    path = ms.save_model(mlp, key, ms.evaluation_metadata(mlp, X_train, X_test, y_test, dio.DATASET_PATH))
+    print(f"Modello salvato in '{path}'")
+
+    y_pred = mlp.predict(X_test)
+    acc = accuracy_score(y_test, y_pred)
+
+    print("\n--- RISULTATI TEST SET ---")
+    print(f"Accuratezza: {acc:.2%}")
+    print("\nReport di Classificazione:")
+    print(classification_report(y_test, y_pred, target_names=['AI Wins (-1)', 'Draw (0)', 'Player Wins (1)']))
+
+    # Confronto con l'euristica di Minimax, calcolata in blocco su tutto il test set
+    heuristic = ai.score_positions(X_test.reshape(-1, gl.ROW_COUNT, gl.COLUMN_COUNT), gl.PLAYER_PIECE)
+    print("Punteggio euristico medio (prospettiva Player) per classe:")
+    for label, name in LABELS:
+        if (y_test == label).any():
+            print(f"  {name:<12} {heuristic[y_test == label].mean():.2f}")
+
+    cm = confusion_matrix(y_test, y_pred, labels=[-1, 0, 1])
+    return mlp.loss_curve_, mlp.validation_scores_, cm
+
+def train_out_of_core():
+    # Il dataset non viene mai caricato tutto: training, validazione e test sono letti a blocchi
+    model, history = ms.train_streaming(dio.DATASET_PATH)
+    metadata = ms.streaming_metadata(model, history, dio.DATASET_PATH)
+    path = ms.save_model(model, ms.artifact_key(dio.DATASET_PATH, ms.training_params(True)), metadata)
+    print(f"Modello salvato in '{path}' (epoche: {metadata['epochs']})")
+
+    # Matrice di confusione ed euristica accumulate blocco per blocco sul test set
+    cm = np.zeros((3, 3), dtype=np.int64)
+    heuristic_sum = np.zeros(3)
+    for X, y in ms.iter_split(dio.DATASET_PATH, "test"):
+        cm += confusion_matrix(y, model.predict(X), labels=[-1, 0, 1])
+        heuristic = ai.score_positions(X.reshape(-1, gl.ROW_COUNT, gl.COLUMN_COUNT), gl.PLAYER_PIECE)
+        for i, (label, _) in enumerate(LABELS):
+            heuristic_sum[i] += heuristic[y == label].sum()
+
+    print("\n--- RISULTATI TEST SET ---")
+    print(f"Test su {cm.sum()} campioni. Accuratezza: {np.trace(cm) / cm.sum():.2%}")
+    print("\nReport di Classificazione:")
+    print(f"{'':<16} {'precision':>9} {'recall':>9} {'support':>9}")
+    for i, (label, name) in enumerate(LABELS):
+        precision = cm[i, i] / cm[:, i].sum() if cm[:, i].sum() else 0.0
+        recall = cm[i, i] / cm[i].sum() if cm[i].sum() else 0.0
+        print(f"{name + f' ({label})':<16} {precision:>9.2f} {recall:>9.2f} {cm[i].sum():>9}")
+
+    print("\nPunteggio euristico medio (prospettiva Player) per classe:")
+    for i, (_, name) in enumerate(LABELS):
+        if cm[i].sum():
+            print(f"  {name:<12} {heuristic_sum[i] / cm[i].sum():.2f}")
+
+    return history["loss"], history["validation_accuracy"], cm
+
+def run_analysis(streaming=None):
     print("--- CARICAMENTO DATASET ---")
     try:
-        df = pd.read_csv("connect4_dataset_hq.csv")
+        X, y = dio.load_xy()
     except FileNotFoundError:
         print("ERRORE: Esegui prima 'generate_dataset.py'!")
         return
 
-    X = df.iloc[:, 0:42].values
-    y = df.iloc[:, 42].values
-
-    # Split 80/20
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    print(f"Training su {len(X_train)} campioni, Test su {len(X_test)} campioni.")
-
-    mlp = MLPClassifier(hidden_layer_sizes=(64, 32), 
-                        activation='relu', 
-                        max_iter=500, 
-                        random_state=42,
-                        early_stopping=True, # Importante per vedere la validation loss
-                        validation_fraction=0.1)
-
-    print("--- ADDESTRAMENTO IN CORSO... ---")
-    mlp.fit(X_train, y_train)
+    if streaming is None:
+        streaming = ms.use_streaming(dio.DATASET_PATH)
+    print(f"--- ADDESTRAMENTO IN CORSO ({'a blocchi' if streaming else 'in memoria'})... ---")
+    if streaming:
+        loss_curve, validation_scores, cm = train_out_of_core()
+    else:
+        loss_curve, validation_scores, cm = train_in_memory(X, y)
 
     plt.figure(figsize=(10, 6))
-    plt.plot(mlp.loss_curve_, label='Training Loss', color='blue')
+    plt.plot(loss_curve, label='Training Loss', color='blue')
     plt.title('Curva di Convergenza (Loss) - MLP', fontsize=14)
     plt.xlabel('Iterazioni (Epoche)', fontsize=12)
     plt.ylabel('Loss', fontsize=12)
@@ -44,7 +100,7 @@ def run_analysis():
     plt.figure(figsize=(12, 5))
 
     plt.subplot(1, 2, 1)
-    plt.plot(mlp.loss_curve_, label='Training Loss', color='red')
+    plt.plot(loss_curve, label='Training Loss', color='red')
     plt.title('Discesa del Gradiente (Loss)', fontsize=12)
     plt.xlabel('Epoche')
     plt.ylabel('Loss')
@@ -52,7 +108,7 @@ def run_analysis():
     plt.legend()
 
     plt.subplot(1, 2, 2)
-    plt.plot(mlp.validation_scores_, label='Validation Accuracy', color='green')
+    plt.plot(validation_scores, label='Validation Accuracy', color='green')
     plt.title('Capacità di Generalizzazione', fontsize=12)
     plt.xlabel('Epoche')
     plt.ylabel('Accuracy')
@@ -63,17 +119,8 @@ def run_analysis():
     plt.savefig('images/training_performance.png', dpi=300)
     print("Grafico Performance salvato in 'images/training_performance.png'")
 
-    y_pred = mlp.predict(X_test)
-    acc = accuracy_score(y_test, y_pred)
-    
-    print("\n--- RISULTATI TEST SET ---")
-    print(f"Accuratezza: {acc:.2%}")
-    print("\nReport di Classificazione:")
-    print(classification_report(y_test, y_pred, target_names=['AI Wins (-1)', 'Draw (0)', 'Player Wins (1)']))
-
-    cm = confusion_matrix(y_test, y_pred, labels=[-1, 0, 1])
     disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=['AI', 'Draw', 'Player'])
-    
+
     plt.figure(figsize=(8, 8))
     disp.plot(cmap=plt.cm.Blues)
     plt.title('Matrice di Confusione')
@@ -82,6 +129,12 @@ def run_analysis():
 
 if __name__ == "__main__":
     import os
+    parser = argparse.ArgumentParser(description="Addestramento e analisi della rete neurale")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--streaming", dest="streaming", action="store_true", default=None,
+                      help="Addestramento a blocchi con partial_fit (automatico per dataset grandi)")
+    mode.add_argument("--in-memory", dest="streaming", action="store_false", help="Forza l'addestramento in memoria")
+    args = parser.parse_args()
     if not os.path.exists('images'):
         os.makedirs('images')
-    run_analysis()
\ No newline at end of file
+    run_analysis(args.streaming)
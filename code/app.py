@@ -1,14 +1,16 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
+import json
+import logging
+import os
 import time
 import random
-from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
 
 import game_logic as gl
 import ai_engines as ai
+import model_store as ms
+import pondering
+import position_cache as pc
 
 st.set_page_config(page_title="T.W.A.I. - Connect4", page_icon="🔴", layout="centered")
 
@@ -18,22 +20,35 @@ def local_css(file_name):
 
 local_css("styles/style.css")
 
-# Carichiamo il modello MLP una sola volta e lo teniamo in cache per tutta la sessione
+# Una riga JSON per ogni mossa dell'AI. Streamlit configura solo i propri logger: il livello
+# si imposta con TWAI_LOG_LEVEL e l'handler viene aggiunto una volta sola (lo script viene rieseguito)
+logger = logging.getLogger("twai")
+logger.setLevel(os.environ.get("TWAI_LOG_LEVEL", "INFO").upper())
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.propagate = False
+
+# Carichiamo il modello MLP una sola volta e lo teniamo in cache per tutta la sessione.
+# I pesi vengono letti dall'archivio dei modelli: si riaddestra solo se dataset o iperparametri cambiano.
 @st.cache_resource
 def load_mlp_model():
     try:
-        df = pd.read_csv("connect4_dataset_hq.csv")
-        X = df.iloc[:, 0:42].values 
-        y = df.iloc[:, 42].values   
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        mlp = MLPClassifier(hidden_layer_sizes=(64, 32), activation='relu', max_iter=500, random_state=42)
-        mlp.fit(X_train, y_train)
-        acc = accuracy_score(y_test, mlp.predict(X_test))
-        return mlp, acc
+        model, metadata = ms.load_or_train()
+        return model, metadata["accuracy"]
     except FileNotFoundError:
         return None, 0.0
 
+# Mosse di Minimax condivise da tutte le sessioni del processo: le posizioni già viste
+# (anche da altri giocatori) ricevono subito la risposta. Con TWAI_MOVE_CACHE la cache
+# è salvata anche su disco (SQLite) e sopravvive ai riavvii.
+MOVE_CACHE_MB = 64
+
+@st.cache_resource
+def load_move_cache():
+    return pc.MoveCache(max_bytes=MOVE_CACHE_MB * 1024 * 1024, path=os.environ.get("TWAI_MOVE_CACHE"))
+
 if 'board' not in st.session_state:
     st.session_state.board = gl.create_board()
     st.session_state.game_over = False
@@ -41,6 +56,10 @@ if 'board' not in st.session_state:
     st.session_state.winner = None
     st.session_state.winning_cells = [] 
     st.session_state.last_move = None # Per evidenziare l'ultima mossa AI
+    st.session_state.tt = ai.TranspositionTable() # Sopravvive tra le mosse della stessa partita
+    st.session_state.last_stats = None # Statistiche dell'ultima mossa AI
+    st.session_state.last_wait = 0.0 # Attesa effettiva per l'ultima mossa AI
+    st.session_state.ponderer = None # Ricerca in background durante il turno del giocatore
 
 def handle_click(col):
     """Gestisce il click sui pulsanti superiori"""
@@ -49,7 +68,7 @@ def handle_click(col):
             row = gl.get_next_open_row(st.session_state.board, col)
             gl.drop_piece(st.session_state.board, row, col, gl.PLAYER_PIECE)
             
-            if gl.winning_move(st.session_state.board, gl.PLAYER_PIECE):
+            if gl.winning_move_at(st.session_state.board, row, col):
                 st.session_state.game_over = True
                 st.session_state.winner = "PLAYER"
                 st.session_state.winning_cells = gl.get_winning_coordinates(st.session_state.board, gl.PLAYER_PIECE)
@@ -63,6 +82,11 @@ def reset_game():
     st.session_state.winner = None
     st.session_state.winning_cells = []
     st.session_state.last_move = None
+    st.session_state.tt = ai.TranspositionTable()
+    st.session_state.last_stats = None
+    if st.session_state.ponderer is not None:
+        st.session_state.ponderer.stop()
+    st.session_state.ponderer = None
 
 with st.sidebar:
     st.title("⚙️ Impostazioni")
@@ -74,6 +98,21 @@ with st.sidebar:
         captions=["Logica Pura", "Intuito Statistico (Veloce)"]
     )
     
+    think_time_ms = 250
+    search_mode = "Tempo"
+    ponder_enabled = False
+    solver_threshold = ai.SOLVER_EMPTY_CELLS
+    if algo_choice.startswith("Minimax"):
+        search_mode = st.radio("🔍 Modalità di ricerca", ["Tempo", "Profondità fissa (multi-core)"], horizontal=True)
+        if search_mode == "Tempo":
+            think_time_ms = st.slider("⏱️ Tempo di riflessione (ms)", min_value=50, max_value=3000, value=250, step=50)
+            ponder_enabled = st.checkbox("💭 Pondering", value=True, help="Calcola le risposte mentre tocca a te")
+        else:
+            fixed_depth = st.slider("📏 Profondità", min_value=4, max_value=10, value=8)
+            search_workers = st.number_input("🧵 Processi", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
+        solver_threshold = st.slider("🎯 Risolutore esatto (celle vuote)", min_value=0, max_value=24, value=ai.SOLVER_EMPTY_CELLS,
+                                     help="Nel finale, con al più queste celle vuote, la mossa è calcolata esattamente (0 = mai)")
+    
     mlp_model, mlp_acc = load_mlp_model()
     
     if algo_choice == "Rete Neurale (MLP)":
@@ -82,6 +121,37 @@ with st.sidebar:
         else:
             st.error("Dataset non trovato. Esegui prima 'generate_dataset.py'")
      
+    with st.expander("🔬 Diagnostica"):
+        profile_cpu = st.checkbox("Profilazione CPU (cProfile)")
+        profile_memory = st.checkbox("Profilazione memoria (tracemalloc)")
+        last_stats = st.session_state.last_stats
+        if last_stats is None:
+            st.caption("Nessuna mossa dell'IA in questa partita.")
+        elif last_stats.source == "book":
+            st.info(f"📖 Mossa dal libro delle aperture ({st.session_state.last_wait * 1000:.1f} ms)")
+        elif last_stats.source == "cache":
+            st.info(f"♻️ Mossa dalla cache condivisa ({st.session_state.last_wait * 1000:.1f} ms)")
+        else:
+            if last_stats.source == "solver":
+                st.info("🎯 Finale risolto esattamente")
+            if last_stats.source == "ponder":
+                st.info(f"💭 Risposta calcolata durante il tuo turno (pronta in {st.session_state.last_wait * 1000:.1f} ms)")
+            c1, c2 = st.columns(2)
+            c1.metric("Nodi", f"{last_stats.nodes:,}")
+            c2.metric("Nodi/s", f"{last_stats.nodes_per_second():,.0f}")
+            c1.metric("Foglie valutate", f"{last_stats.leaves:,}")
+            c2.metric("Tagli beta", f"{last_stats.cutoffs:,}")
+            c1.metric("Tagli alla 1ª mossa", f"{last_stats.first_move_cutoff_ratio():.1%}")
+            c2.metric("Profondità max", last_stats.max_depth)
+            st.caption(f"Tempo di ricerca: {last_stats.elapsed * 1000:.1f} ms")
+        if last_stats is not None and last_stats.peak_memory is not None:
+            st.caption(f"Picco di memoria: {last_stats.peak_memory / 1024:.0f} KiB")
+        if last_stats is not None and last_stats.profile:
+            st.code(last_stats.profile, language=None)
+        move_cache = load_move_cache()
+        st.caption(f"Cache condivisa: {len(move_cache):,} posizioni, {move_cache.size / 1024 / 1024:.1f} MiB, "
+                   f"hit rate {move_cache.hit_rate():.1%}")
+
     st.markdown("---")
     if st.button("🔄 Nuova Partita", use_container_width=True):
         reset_game()
@@ -145,22 +215,66 @@ with game_container:
                 </button>
                 """, unsafe_allow_html=True)
 
+use_ponder = algo_choice.startswith("Minimax") and search_mode == "Tempo" and ponder_enabled
+ponderer = st.session_state.ponderer
+if ponderer is not None and (not use_ponder or st.session_state.game_over or
+                             (ponderer.think_time, ponderer.solver_threshold) != (think_time_ms / 1000, solver_threshold)):
+    ponderer.stop()
+    ponderer = st.session_state.ponderer = None
+
+if use_ponder and not st.session_state.game_over and st.session_state.turn == 0:
+    # Mentre il giocatore sceglie, l'AI prepara le risposte a tutte le sue mosse
+    if ponderer is None:
+        ponderer = st.session_state.ponderer = pondering.Ponderer(think_time_ms / 1000, solver_threshold)
+    ponderer.start(st.session_state.board)
+
 if not st.session_state.game_over and st.session_state.turn == 1:
-    time.sleep(0.3) # Piccola pausa per UX
-    
     col = None
-    start_time = time.time()
+    stats = ai.SearchStats()
+    start_time = time.perf_counter()
     
+    # La mossa dipende dalla configurazione della ricerca, che fa parte della chiave
+    cache_config = None
     if algo_choice.startswith("Minimax"):
-        col, _ = ai.minimax(st.session_state.board, 6, -float('inf'), float('inf'), True)
+        cache_config = (f"tempo:{think_time_ms}:{solver_threshold}" if search_mode == "Tempo"
+                        else f"depth:{fixed_depth}:{solver_threshold}")
+    move_cache = load_move_cache()
+    cached = move_cache.get_board(cache_config, st.session_state.board) if cache_config else None
+
+    pondered = None
+    if ponderer is not None:
+        if cached is None:
+            pondered = ponderer.take(st.session_state.board)
+        ponderer.stop() # Le altre risposte non servono più
+    if cached is not None:
+        col = cached
+        stats.source = "cache"
+    elif pondered is not None:
+        col, stats = pondered
     else:
-        # MLP
-        if mlp_model:
-            col = ai.get_neural_move(mlp_model, st.session_state.board)
-        else:
-            col = random.choice(gl.get_valid_locations(st.session_state.board))
+        with ai.profile_search(stats, cprofile=profile_cpu, memory=profile_memory):
+            if algo_choice.startswith("Minimax"):
+                if search_mode == "Tempo":
+                    col = ai.get_minimax_move(st.session_state.board, think_time=think_time_ms / 1000, tt=st.session_state.tt, stats=stats,
+                                              solver_threshold=solver_threshold)
+                else:
+                    col = ai.get_minimax_move(st.session_state.board, depth=fixed_depth, workers=int(search_workers), stats=stats,
+                                              solver_threshold=solver_threshold)
+            else:
+                # MLP
+                if mlp_model:
+                    col = ai.get_neural_move(mlp_model, st.session_state.board)
+                else:
+                    col = random.choice(gl.get_valid_locations(st.session_state.board))
     
-    end_time = time.time()
+    end_time = time.perf_counter()
+    if pondered is None:
+        stats.elapsed = end_time - start_time
+    if cache_config and col is not None and stats.source not in ("cache", "book"):
+        move_cache.put_board(cache_config, st.session_state.board, col)
+    st.session_state.last_stats = stats
+    st.session_state.last_wait = end_time - start_time
+    logger.info("Mossa AI %s", json.dumps(dict(stats.as_dict(), engine=algo_choice.split()[0], move=None if col is None else int(col))))
     
     # Applicazione Mossa AI
     if col is not None and gl.is_valid_location(st.session_state.board, col):
@@ -168,7 +282,7 @@ if not st.session_state.game_over and st.session_state.turn == 1:
         gl.drop_piece(st.session_state.board, row, col, gl.AI_PIECE)
         st.session_state.last_move = (row, col)
         
-        if gl.winning_move(st.session_state.board, gl.AI_PIECE):
+        if gl.winning_move_at(st.session_state.board, row, col):
             st.session_state.game_over = True
             st.session_state.winner = "AI"
             st.session_state.winning_cells = gl.get_winning_coordinates(st.session_state.board, gl.AI_PIECE)
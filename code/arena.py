@@ -0,0 +1,186 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np
+
+import game_logic as gl
+import ai_engines as ai
+import model_store as ms
+
+# Torneo senza interfaccia tra configurazioni di motori. Ogni motore gioca sempre
+# "come AI": quando tocca al primo giocatore la board viene invertita (-board).
+# Specifiche dei motori: "minimax:<profondità>", "mlp", "random".
+
+def parse_engine(spec):
+    name, _, arg = spec.partition(":")
+    if name == "minimax":
+        return name, int(arg or 4)
+    if name in ("mlp", "random") and not arg:
+        return name, None
+    raise ValueError(f"Motore sconosciuto: '{spec}' (usa minimax:<profondità>, mlp o random)")
+
+_worker_model = None
+
+def _init_arena_worker():
+    global _worker_model
+    _worker_model = ms.load_trained()
+
+def choose_move(spec, board, rng):
+    """Mossa del motore spec per il giocatore AI_PIECE su board"""
+    name, depth = parse_engine(spec)
+    valid_locations = gl.get_valid_locations(board)
+    if name == "minimax":
+        col, _ = ai.minimax(board, depth, -float('inf'), float('inf'), True)
+    elif name == "mlp":
+        if _worker_model is None:
+            raise RuntimeError("Nessun modello MLP salvato: esegui prima 'analysis_mlp.py'")
+        col = ai.get_neural_move(_worker_model, board)
+    else:
+        col = rng.choice(valid_locations)
+    if col is None or col not in valid_locations: # Posizione persa in ogni caso
+        col = rng.choice(valid_locations)
+    return col
+
+def random_opening(rng, plies):
+    # Apertura casuale senza vittorie: le stesse mosse vengono giocate a colori invertiti
+    while True:
+        board = gl.create_board()
+        moves = []
+        piece = gl.PLAYER_PIECE
+        for _ in range(plies):
+            col = rng.choice(gl.get_valid_locations(board))
+            row = gl.get_next_open_row(board, col)
+            gl.drop_piece(board, row, col, piece)
+            if gl.winning_move_at(board, row, col):
+                break
+            moves.append(col)
+            piece *= -1
+        if len(moves) == plies:
+            return moves
+
+def play_game(first, second, opening, seed):
+    """Partita tra first (muove per primo) e second dopo le mosse di apertura.
+    Restituisce (risultato per first: 1/0/-1, latenze di first, latenze di second, mosse)."""
+    rng = random.Random(seed)
+    random.seed(seed) # get_neural_move usa il generatore globale
+    board = gl.create_board()
+    engines = {gl.PLAYER_PIECE: first, gl.AI_PIECE: second}
+    latencies = {gl.PLAYER_PIECE: [], gl.AI_PIECE: []}
+    moves = list(opening)
+    piece = gl.PLAYER_PIECE
+    for col in opening:
+        gl.drop_piece(board, gl.get_next_open_row(board, col), col, piece)
+        piece *= -1
+
+    result = 0
+    while gl.get_valid_locations(board):
+        view = board if piece == gl.AI_PIECE else -board
+        start = time.perf_counter()
+        col = choose_move(engines[piece], view, rng)
+        latencies[piece].append(time.perf_counter() - start)
+        row = gl.get_next_open_row(board, col)
+        gl.drop_piece(board, row, col, piece)
+        moves.append(col)
+        if gl.winning_move_at(board, row, col):
+            result = 1 if piece == gl.PLAYER_PIECE else -1
+            break
+        piece *= -1
+    return result, latencies[gl.PLAYER_PIECE], latencies[gl.AI_PIECE], moves
+
+def schedule(engines, games, seed, opening_plies):
+    """Partite del torneo all'italiana: per ogni coppia games partite, ogni apertura
+    giocata due volte a colori invertiti. Il calendario dipende solo dal seed."""
+    jobs = []
+    for a, b in combinations(engines, 2):
+        for i in range((games + 1) // 2):
+            rng = random.Random(f"{seed}:{a}:{b}:{i}")
+            opening = random_opening(rng, opening_plies)
+            for first, second in ((a, b), (b, a))[:games - 2 * i]:
+                jobs.append((first, second, opening, f"{seed}:{first}:{second}:{i}"))
+    return jobs
+
+def _play_job(job):
+    return job, play_game(*job)
+
+def elo_ratings(engines, scores, iterations=200):
+    """Stima Bradley-Terry delle forze (un pareggio vale mezza vittoria), in punti Elo.
+    scores[(a, b)] = (punti di a, partite). Ogni coppia riceve una patta virtuale per
+    evitare valori infiniti; il primo motore è fissato a 0."""
+    games, points = {}, {e: 0.0 for e in engines}
+    for (a, b), (score, n) in scores.items():
+        games[(a, b)] = games[(b, a)] = n + 1
+        points[a] += score + 0.5
+        points[b] += n - score + 0.5
+    gamma = {e: 1.0 for e in engines}
+    for _ in range(iterations):
+        for e in engines:
+            denom = sum(n / (gamma[e] + gamma[o]) for (x, o), n in games.items() if x == e)
+            if denom:
+                gamma[e] = points[e] / denom
+    return {e: 400 * math.log10(gamma[e] / gamma[engines[0]]) for e in engines}
+
+def run_tournament(engines, games=100, workers=None, seed=0, opening_plies=2):
+    jobs = schedule(engines, games, seed, opening_plies)
+    print(f"Torneo: {len(engines)} motori, {len(jobs)} partite, aperture di {opening_plies} mosse (seed {seed})")
+    pair_stats = {pair: [0, 0, 0] for pair in combinations(engines, 2)} # vittorie, patte, sconfitte del primo
+    latencies = {e: [] for e in engines}
+    start = time.perf_counter()
+
+    chunksize = max(1, len(jobs) // (8 * (workers or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_arena_worker) as pool:
+        results = pool.map(_play_job, jobs, chunksize=chunksize)
+        for done, ((first, second, _, _), (result, lat_first, lat_second, _)) in enumerate(results, 1):
+            latencies[first].extend(lat_first)
+            latencies[second].extend(lat_second)
+            if (first, second) in pair_stats:
+                pair_stats[(first, second)][1 - result] += 1
+            else:
+                pair_stats[(second, first)][1 + result] += 1
+            if done % 100 == 0 or done == len(jobs):
+                print(f"Partite {done}/{len(jobs)} ({done / (time.perf_counter() - start):.1f} partite/s)")
+
+    scores = {pair: (w + d / 2, w + d + l) for pair, (w, d, l) in pair_stats.items()}
+    elo = elo_ratings(list(engines), scores)
+    report = {"meta": {"seed": seed, "games_per_pair": games, "opening_plies": opening_plies,
+                       "elapsed_s": round(time.perf_counter() - start, 2)},
+              "pairs": [], "engines": []}
+
+    print(f"\n{'Coppia':<28} | {'V':>5} | {'P':>5} | {'S':>5} | {'Punti':>6}")
+    print("-" * 60)
+    for (a, b), (w, d, l) in pair_stats.items():
+        n = w + d + l
+        report["pairs"].append({"engine": a, "opponent": b, "wins": w, "draws": d, "losses": l})
+        print(f"{a + ' vs ' + b:<28} | {w / n:>5.1%} | {d / n:>5.1%} | {l / n:>5.1%} | {(w + d / 2) / n:>6.1%}")
+
+    print(f"\n{'Motore':<14} | {'Elo':>7} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9}")
+    print("-" * 60)
+    for e in sorted(engines, key=elo.get, reverse=True):
+        p50, p95, p99 = np.percentile(latencies[e], [50, 95, 99]) * 1000 if latencies[e] else (0.0, 0.0, 0.0)
+        report["engines"].append({"engine": e, "elo": round(elo[e], 1), "moves": len(latencies[e]),
+                                  "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3)})
+        print(f"{e:<14} | {elo[e]:>7.0f} | {p50:>9.2f} | {p95:>9.2f} | {p99:>9.2f}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Torneo tra motori senza interfaccia grafica")
+    parser.add_argument("--engines", nargs="+", default=["minimax:2", "minimax:4", "random"],
+                        help="Es. minimax:4 minimax:6 mlp random")
+    parser.add_argument("--games", type=int, default=100, help="Partite per ogni coppia di motori")
+    parser.add_argument("--workers", type=int, default=None, help="Processi (default: tutti i core)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-plies", type=int, default=2, help="Mosse casuali di apertura")
+    parser.add_argument("--output", default=None, help="Salva il resoconto in JSON")
+    args = parser.parse_args()
+
+    for spec in args.engines:
+        parse_engine(spec)
+    report = run_tournament(args.engines, args.games, args.workers, args.seed, args.opening_plies)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResoconto salvato in '{args.output}'")
@@ -1,37 +1,183 @@
+import argparse
+import json
+import platform
+import sys
 import time
-import pandas as pd
+import numpy as np
+
 import game_logic as gl
 import ai_engines as ai
+import model_store as ms
+
+# Corpus fisso di posizioni (sequenze di colonne, il giocatore muove per primo):
+# in tutte tocca all'AI, nessuna è già terminale.
+CORPUS = {
+    "opening_center": [3],
+    "opening_edge": [0],
+    "opening_3ply": [3, 3, 2],
+    "midgame_a": [1, 4, 6, 6, 6, 0, 2, 0, 3, 6, 3, 3, 5],
+    "midgame_b": [6, 6, 0, 0, 0, 2, 6, 1, 5, 6, 5, 6, 2, 2, 4],
+    "endgame_a": [1, 1, 6, 2, 1, 1, 4, 5, 5, 6, 0, 2, 1, 6, 0, 2, 1, 3, 0, 5, 6, 0, 0, 0, 2, 6, 2],
+    "endgame_b": [3, 5, 5, 0, 4, 6, 5, 5, 5, 3, 5, 0, 0, 6, 2, 1, 6, 6, 3, 4, 0, 2, 3, 3, 6, 2, 0, 4, 2, 3, 4],
+}
 
-def run_benchmark():
+def build_board(moves):
     board = gl.create_board()
-    
-    gl.drop_piece(board, 0, 3, gl.PLAYER_PIECE) # Player gioca al centro
-    gl.drop_piece(board, 1, 3, gl.AI_PIECE)     # AI risponde sopra
-    
-    depths = [1, 2, 3, 4, 5, 6, 7] # 7 ora è fattibile con le ottimizzazioni
+    piece = gl.PLAYER_PIECE
+    for col in moves:
+        gl.drop_piece(board, gl.get_next_open_row(board, col), col, piece)
+        piece *= -1
+    return board
+
+ORDERINGS = ["static", "dynamic"]
+
+def bench_minimax(board, depth, repeat=1, ordering="static"):
+    best_time = None
+    for _ in range(repeat):
+        stats = ai.SearchStats()
+        move_ordering = ai.MoveOrdering() if ordering == "dynamic" else None
+        col, value = ai.minimax(board, depth, -float('inf'), float('inf'), True, stats=stats, ordering=move_ordering)
+        if best_time is None or stats.elapsed < best_time:
+            best_time = stats.elapsed
+
+    interior = stats.nodes - stats.leaves
+    return {
+        "engine": "minimax", "ordering": ordering, "depth": depth, "move": col, "value": value,
+        "time_s": round(best_time, 6),
+        "nodes": stats.nodes,
+        "leaves": stats.leaves,
+        "nodes_per_sec": round(stats.nodes / best_time, 1) if best_time > 0 else 0.0,
+        # Fattore di ramificazione effettivo: nodi^(1/profondità)
+        "branching_factor": round(stats.nodes ** (1 / depth), 3),
+        "cutoffs": stats.cutoffs,
+        "cutoff_rate": round(stats.cutoffs / interior, 4) if interior else 0.0,
+        "first_move_cutoff_ratio": round(stats.first_move_cutoff_ratio(), 4),
+        "max_depth": stats.max_depth,
+    }
+
+def bench_neural(model, board, repeat=1):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        col = ai.get_neural_move(model, board)
+        times.append(time.perf_counter() - start)
+    return {
+        "engine": "neural", "depth": 0, "move": col,
+        "time_s": round(min(times), 6),
+        "candidates": len(gl.get_valid_locations(board)),
+    }
+
+def run_benchmark(depths=range(1, 8), repeat=1, positions=None, orderings=("static",)):
+    positions = positions or list(CORPUS)
     results = []
 
-    print(f"{'Depth':<10} | {'Time (sec)':<15} | {'Nodi stimati'}")
-    print("-" * 45)
-
-    for d in depths:
-        start_time = time.time()
-    
-        _ = ai.minimax(board, d, -float('inf'), float('inf'), True)
-        
-        end_time = time.time()
-        elapsed = end_time - start_time
-        
-        nodes_est = 7**d 
-        
-        print(f"{d:<10} | {elapsed:.4f}          | ~{nodes_est}")
-        
-        results.append({
-            "Profondità": d,
-            "Tempo (s)": round(elapsed, 4),
-            "Note": "Ok" if elapsed < 1.0 else ("Lento" if elapsed > 5.0 else "Accettabile")
-        })
+    print(f"{'Posizione':<16} | {'Ordine':<7} | {'Depth':<5} | {'Time (sec)':<10} | {'Nodi':>9} | {'kN/s':>7} | {'EBF':>6} | {'Cutoff':>6} | {'1st cut':>7}")
+    print("-" * 100)
+
+    for name in positions:
+        board = build_board(CORPUS[name])
+        for d in depths:
+            for ordering in orderings:
+                r = bench_minimax(board, d, repeat, ordering)
+                r["position"] = name
+                results.append(r)
+                print(f"{name:<16} | {ordering:<7} | {d:<5} | {r['time_s']:<10.4f} | {r['nodes']:>9} | {r['nodes_per_sec']/1000:>7.1f} | "
+                      f"{r['branching_factor']:>6.2f} | {r['cutoff_rate']:>6.1%} | {r['first_move_cutoff_ratio']:>7.1%}")
+
+    if len(orderings) > 1:
+        summarize_orderings(results, orderings)
+
+    model = ms.load_trained()
+    if model is None:
+        print("\nRete neurale saltata: nessun modello salvato (esegui prima 'analysis_mlp.py').")
+    else:
+        print()
+        for name in positions:
+            r = bench_neural(model, build_board(CORPUS[name]), max(repeat, 20))
+            r["position"] = name
+            results.append(r)
+            print(f"{name:<16} | MLP   | {r['time_s'] * 1e6:.0f} µs")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def summarize_orderings(results, orderings):
+    # Riduzione complessiva dei nodi e del tempo rispetto al primo ordinamento
+    base = orderings[0]
+    totals = {o: [0, 0.0] for o in orderings}
+    for r in results:
+        if r["engine"] == "minimax":
+            totals[r["ordering"]][0] += r["nodes"]
+            totals[r["ordering"]][1] += r["time_s"]
+    print()
+    for o in orderings[1:]:
+        print(f"Ordinamento {o} vs {base}: nodi {totals[o][0] / totals[base][0]:.1%}, "
+              f"tempo {totals[o][1] / totals[base][1]:.1%}")
+
+def _result_key(r):
+    return (r["engine"], r.get("ordering", "static"), r["position"], r["depth"])
+
+def compare(current, baseline, threshold=0.15, min_time=0.01):
+    """Confronta con un baseline: restituisce la lista dei peggioramenti oltre la soglia.
+    I tempi sotto min_time secondi sono troppo rumorosi e non vengono confrontati;
+    i nodi sono deterministici, quindi qualunque aumento viene segnalato."""
+    base = {_result_key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get(_result_key(r))
+        if b is None:
+            continue
+        label = f"{r['engine']}/{r.get('ordering', 'static')}/{r['position']}/d{r['depth']}"
+        if b["time_s"] >= min_time and r["time_s"] > b["time_s"] * (1 + threshold):
+            regressions.append(f"{label}: tempo {b['time_s']:.4f}s -> {r['time_s']:.4f}s "
+                               f"(+{r['time_s'] / b['time_s'] - 1:.0%})")
+        if "nodes" in r and "nodes" in b and r["nodes"] > b["nodes"]:
+            regressions.append(f"{label}: nodi {b['nodes']} -> {r['nodes']}")
+        if r["move"] != b["move"]:
+            print(f"Nota: {label} ora sceglie la colonna {r['move']} (baseline {b['move']})")
+    return regressions
+
+def _parse_depths(text):
+    if "-" in text:
+        lo, hi = text.split("-")
+        return list(range(int(lo), int(hi) + 1))
+    return [int(d) for d in text.split(",")]
 
 if __name__ == "__main__":
-    run_benchmark()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Benchmark dei motori di ricerca su un corpus fisso di posizioni")
+    parser.add_argument("--depths", default="1-7", help="Es. '1-7' oppure '4,6,8'")
+    parser.add_argument("--repeat", type=int, default=3, help="Ripetizioni per misura (si tiene il tempo minimo)")
+    parser.add_argument("--positions", nargs="*", choices=list(CORPUS), default=None)
+    parser.add_argument("--ordering", nargs="+", choices=ORDERINGS, default=["static"],
+                        help="Ordinamento delle mosse da misurare (es. 'static dynamic' per confrontarli)")
+    parser.add_argument("--output", default=None, help="Salva i risultati in JSON")
+    parser.add_argument("--compare", default=None, help="JSON di baseline con cui confrontare")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Peggioramento di tempo tollerato")
+    parser.add_argument("--min-time", type=float, default=0.01, help="Tempo minimo (s) per confrontare le durate")
+    args = parser.parse_args()
+
+    report = run_benchmark(_parse_depths(args.depths), args.repeat, args.positions, args.ordering)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRisultati salvati in '{args.output}'")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_time)
+        if regressions:
+            print("\n--- REGRESSIONI ---")
+            for line in regressions:
+                print(line)
+            sys.exit(1)
+        print("\nNessuna regressione rispetto al baseline.")
@@ -0,0 +1,101 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+import game_logic as gl
+
+# Formato binario del dataset: un header di 16 byte seguito da record di 43 int8
+# (42 celle della board appiattita + etichetta). I record vengono scritti a blocchi
+# durante la generazione e letti con np.memmap senza copie né parsing.
+MAGIC = b"C4DS"
+VERSION = 1
+HEADER_SIZE = 16
+CELLS = gl.ROW_COUNT * gl.COLUMN_COUNT
+RECORD_SIZE = CELLS + 1
+
+DATASET_PATH = "connect4_dataset_hq.c4b"
+CSV_PATH = "connect4_dataset_hq.csv"
+
+def _header():
+    return (MAGIC + bytes([VERSION, CELLS])).ljust(HEADER_SIZE, b"\0")
+
+def _check_header(f, path):
+    header = f.read(HEADER_SIZE)
+    if header[:4] != MAGIC or header[4] != VERSION or header[5] != CELLS:
+        raise ValueError(f"'{path}' non è un dataset binario valido")
+
+class DatasetWriter:
+    """Scrive i campioni in append sul file binario, un blocco alla volta"""
+
+    def __init__(self, path=DATASET_PATH, append=False):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if append and exists:
+            with open(path, "rb") as f:
+                _check_header(f, path)
+            self.f = open(path, "ab")
+        else:
+            self.f = open(path, "wb")
+            self.f.write(_header())
+        self.rows_written = 0
+
+    def write_rows(self, rows):
+        records = np.asarray(rows, dtype=np.int8).reshape(-1, RECORD_SIZE)
+        self.f.write(records.tobytes())
+        self.f.flush()
+        self.rows_written += len(records)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def count_rows(path=DATASET_PATH):
+    return (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+
+def truncate_rows(path, rows):
+    # Scarta i record oltre i primi rows (es. un blocco scritto dopo l'ultimo checkpoint)
+    with open(path, "r+b") as f:
+        _check_header(f, path)
+        f.truncate(HEADER_SIZE + rows * RECORD_SIZE)
+
+def open_dataset(path=DATASET_PATH):
+    """Mappa il file in memoria: restituisce un array (N, 43) int8 in sola lettura"""
+    with open(path, "rb") as f:
+        _check_header(f, path)
+    n = count_rows(path)
+    if n == 0:
+        return np.zeros((0, RECORD_SIZE), dtype=np.int8)
+    return np.memmap(path, dtype=np.int8, mode="r", offset=HEADER_SIZE, shape=(n, RECORD_SIZE))
+
+def convert_csv(csv_path=CSV_PATH, out_path=DATASET_PATH, chunksize=100000):
+    # Conversione a blocchi: il CSV non viene mai caricato tutto in memoria
+    rows = 0
+    with DatasetWriter(out_path) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            writer.write_rows(chunk.iloc[:, 0:RECORD_SIZE].values)
+        rows = writer.rows_written
+    return rows
+
+def load_xy(path=DATASET_PATH, csv_path=CSV_PATH):
+    """Restituisce (X, y) come viste sul memmap. Se esiste solo il vecchio CSV
+    viene convertito una volta nel formato binario."""
+    if not os.path.exists(path):
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(path)
+        convert_csv(csv_path, path)
+    data = open_dataset(path)
+    return data[:, :CELLS], data[:, CELLS]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversione del dataset CSV nel formato binario")
+    parser.add_argument("csv", nargs="?", default=CSV_PATH)
+    parser.add_argument("out", nargs="?", default=DATASET_PATH)
+    args = parser.parse_args()
+    n = convert_csv(args.csv, args.out)
+    print(f"Convertiti {n} campioni da '{args.csv}' a '{args.out}'")
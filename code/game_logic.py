@@ -1,3 +1,4 @@
+import random
 import numpy as np
 
 ROW_COUNT = 6
@@ -46,6 +47,22 @@ def winning_move(board, piece):
                 return True
     return False
 
+def winning_move_at(board, row, col):
+    # Controlla solo le quattro linee che passano per la pedina appena inserita
+    piece = board[row][col]
+    if piece == EMPTY:
+        return False
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            r, c = row + sign*dr, col + sign*dc
+            while 0 <= r < ROW_COUNT and 0 <= c < COLUMN_COUNT and board[r][c] == piece:
+                count += 1
+                r, c = r + sign*dr, c + sign*dc
+        if count >= 4:
+            return True
+    return False
+
 def get_winning_coordinates(board, piece):
     # Orizzontale
     for c in range(COLUMN_COUNT-3):
@@ -67,4 +84,218 @@ def get_winning_coordinates(board, piece):
         for r in range(3, ROW_COUNT):
             if board[r][c] == piece and board[r-1][c+1] == piece and board[r-2][c+2] == piece and board[r-3][c+3] == piece:
                 return [(r, c), (r-1, c+1), (r-2, c+2), (r-3, c+3)]
-    return []
\ No newline at end of file
+    return []
+
+# --- Bitboard ---
+# Ogni posizione è descritta da due interi a 64 bit (uno per giocatore).
+# Ogni colonna occupa BB_HEIGHT = ROW_COUNT+1 bit: il bit di indice
+# col*BB_HEIGHT + row corrisponde a board[row][col], l'ultimo bit della
+# colonna è una sentinella sempre vuota che impedisce agli shift di
+# "scavalcare" da una colonna all'altra.
+BB_HEIGHT = ROW_COUNT + 1
+
+try:
+    popcount = int.bit_count
+except AttributeError: # Python < 3.10
+    def popcount(bb):
+        return bin(bb).count("1")
+
+def cell_bit(row, col):
+    return 1 << (col * BB_HEIGHT + row)
+
+COLUMN_MASKS = [((1 << ROW_COUNT) - 1) << (c * BB_HEIGHT) for c in range(COLUMN_COUNT)]
+BOARD_MASK = sum(COLUMN_MASKS)
+CENTER_MASK = COLUMN_MASKS[COLUMN_COUNT//2]
+
+# Finestre di 4 celle (stesso ordine di score_position: righe, colonne, diagonali)
+def _build_windows():
+    windows = []
+    for r in range(ROW_COUNT):
+        for c in range(COLUMN_COUNT-3):
+            windows.append([(r, c+i) for i in range(4)])
+    for c in range(COLUMN_COUNT):
+        for r in range(ROW_COUNT-3):
+            windows.append([(r+i, c) for i in range(4)])
+    for r in range(ROW_COUNT-3):
+        for c in range(COLUMN_COUNT-3):
+            windows.append([(r+i, c+i) for i in range(4)])
+    for r in range(ROW_COUNT-3):
+        for c in range(COLUMN_COUNT-3):
+            windows.append([(r+3-i, c+i) for i in range(4)])
+    return windows
+
+WINDOWS = _build_windows()
+ROW_WINDOW_COUNT = ROW_COUNT * (COLUMN_COUNT-3)
+WINDOW_MASKS = [sum(cell_bit(r, c) for r, c in w) for w in WINDOWS]
+ROW_WINDOW_MASKS = WINDOW_MASKS[:ROW_WINDOW_COUNT]
+# Indici delle celle di ogni finestra nella board appiattita (r*COLUMN_COUNT + c)
+WINDOW_INDEX = np.array([[r*COLUMN_COUNT + c for r, c in w] for w in WINDOWS])
+
+# --- Versioni vettoriali ---
+# Stesse operazioni della prima parte del modulo su uno stack di board (N, 6, 7),
+# con una sola chiamata numpy per tutte le partite.
+def create_boards(n):
+    return np.zeros((n, ROW_COUNT, COLUMN_COUNT))
+
+def get_valid_locations_mask(boards):
+    """Maschera (N, 7): True dove la colonna non è piena"""
+    return boards[:, ROW_COUNT-1, :] == 0
+
+def get_next_open_rows(boards, cols):
+    # Le pedine sono impilate dal basso: la prima riga libera è il numero di pedine nella colonna
+    return np.count_nonzero(boards[np.arange(len(boards)), :, cols], axis=1)
+
+def drop_pieces(boards, rows, cols, pieces):
+    boards[np.arange(len(boards)), rows, cols] = pieces
+
+def winning_moves(boards, pieces):
+    """Per ogni board, True se il pezzo corrispondente in pieces (scalare o (N,)) ha quattro in fila"""
+    pieces = np.broadcast_to(np.asarray(pieces, dtype=boards.dtype), (len(boards),))
+    windows = boards.reshape(len(boards), -1)[:, WINDOW_INDEX]
+    return (windows == pieces[:, None, None]).all(axis=2).any(axis=1)
+
+def board_to_bitboard(board):
+    """Converte la matrice numpy in (bitboard giocatore, bitboard AI, altezze delle colonne)"""
+    rows = np.asarray(board).tolist()
+    bb_player = 0
+    bb_ai = 0
+    heights = []
+    for c in range(COLUMN_COUNT):
+        height = None
+        for r in range(ROW_COUNT):
+            val = rows[r][c]
+            if val == PLAYER_PIECE:
+                bb_player |= cell_bit(r, c)
+            elif val == AI_PIECE:
+                bb_ai |= cell_bit(r, c)
+            elif height is None:
+                height = r
+        heights.append(ROW_COUNT if height is None else height)
+    return bb_player, bb_ai, heights
+
+def bitboard_to_board(bb_player, bb_ai):
+    board = create_board()
+    for r in range(ROW_COUNT):
+        for c in range(COLUMN_COUNT):
+            if bb_player & cell_bit(r, c):
+                board[r][c] = PLAYER_PIECE
+            elif bb_ai & cell_bit(r, c):
+                board[r][c] = AI_PIECE
+    return board
+
+def bb_mirror(bb):
+    # Riflessione destra-sinistra: la colonna c diventa la colonna COLUMN_COUNT-1-c
+    mirrored = 0
+    for c in range(COLUMN_COUNT):
+        mirrored |= ((bb >> (c * BB_HEIGHT)) & COLUMN_MASKS[0]) << ((COLUMN_COUNT - 1 - c) * BB_HEIGHT)
+    return mirrored
+
+def canonical_key(bb_player, bb_ai):
+    # Una posizione e la sua speculare condividono la stessa chiave
+    return min((bb_player, bb_ai), (bb_mirror(bb_player), bb_mirror(bb_ai)))
+
+def mirror_board(board):
+    return board[:, ::-1].copy()
+
+def bb_valid_locations(heights):
+    return [c for c in range(COLUMN_COUNT) if heights[c] < ROW_COUNT]
+
+def bb_drop_piece(bb, heights, col):
+    # Restituisce il nuovo bitboard e aggiorna l'altezza della colonna
+    bb |= cell_bit(heights[col], col)
+    heights[col] += 1
+    return bb
+
+def bb_winning_move(bb):
+    # Verticale (1), Orizzontale (BB_HEIGHT), Diagonale Positiva (BB_HEIGHT+1), Diagonale Negativa (BB_HEIGHT-1)
+    for shift in (1, BB_HEIGHT, BB_HEIGHT+1, BB_HEIGHT-1):
+        m = bb & (bb >> shift)
+        if m & (m >> (2 * shift)):
+            return True
+    return False
+
+def bb_winning_cells(bb, mask):
+    """Celle vuote (anche non ancora giocabili) che completerebbero un quattro per bb"""
+    # Verticale: solo tre pedine sotto la cella
+    r = (bb << 1) & (bb << 2) & (bb << 3)
+    for shift in (BB_HEIGHT, BB_HEIGHT+1, BB_HEIGHT-1):
+        p = (bb << shift) & (bb << (2 * shift))
+        r |= p & (bb << (3 * shift)) # Tre pedine da un lato
+        r |= p & (bb >> shift)       # Due da un lato e una dall'altro
+        p = (bb >> shift) & (bb >> (2 * shift))
+        r |= p & (bb << shift)
+        r |= p & (bb >> (3 * shift))
+    return r & (BOARD_MASK ^ mask)
+
+# Chiavi Zobrist: una per ogni (giocatore, cella) più una per il lato che muove
+_zobrist_rng = random.Random(20240601)
+ZOBRIST_PLAYER = [_zobrist_rng.getrandbits(64) for _ in range(COLUMN_COUNT * BB_HEIGHT)]
+ZOBRIST_AI = [_zobrist_rng.getrandbits(64) for _ in range(COLUMN_COUNT * BB_HEIGHT)]
+ZOBRIST_AI_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+def zobrist_hash(bb_player, bb_ai, ai_to_move):
+    h = ZOBRIST_AI_TO_MOVE if ai_to_move else 0
+    for i in range(COLUMN_COUNT * BB_HEIGHT):
+        if bb_player >> i & 1:
+            h ^= ZOBRIST_PLAYER[i]
+        elif bb_ai >> i & 1:
+            h ^= ZOBRIST_AI[i]
+    return h
+
+class Position:
+    """Posizione su bitboard modificata in place durante la ricerca.
+    play/undo aggiornano bitboard, altezze delle colonne e hash Zobrist;
+    la pila moves permette di annullare le mosse senza copiare nulla."""
+
+    __slots__ = ('bb_player', 'bb_ai', 'heights', 'moves', 'key')
+
+    def __init__(self, bb_player=0, bb_ai=0, heights=None, ai_to_move=True):
+        self.bb_player = bb_player
+        self.bb_ai = bb_ai
+        self.heights = list(heights) if heights is not None else [0] * COLUMN_COUNT
+        self.moves = []
+        self.key = zobrist_hash(bb_player, bb_ai, ai_to_move)
+
+    @classmethod
+    def from_board(cls, board, ai_to_move=True):
+        bb_player, bb_ai, heights = board_to_bitboard(board)
+        return cls(bb_player, bb_ai, heights, ai_to_move)
+
+    def to_board(self):
+        return bitboard_to_board(self.bb_player, self.bb_ai)
+
+    def can_play(self, col):
+        return self.heights[col] < ROW_COUNT
+
+    def valid_locations(self):
+        return [c for c in range(COLUMN_COUNT) if self.heights[c] < ROW_COUNT]
+
+    def empty_cells(self):
+        return ROW_COUNT * COLUMN_COUNT - sum(self.heights)
+
+    def play(self, col, piece):
+        # Restituisce True se la mossa è vincente per chi l'ha giocata
+        row = self.heights[col]
+        self.heights[col] = row + 1
+        self.moves.append(col)
+        index = col * BB_HEIGHT + row
+        if piece == AI_PIECE:
+            self.bb_ai |= 1 << index
+            self.key ^= ZOBRIST_AI[index] ^ ZOBRIST_AI_TO_MOVE
+            return bb_winning_move(self.bb_ai)
+        self.bb_player |= 1 << index
+        self.key ^= ZOBRIST_PLAYER[index] ^ ZOBRIST_AI_TO_MOVE
+        return bb_winning_move(self.bb_player)
+
+    def undo(self):
+        col = self.moves.pop()
+        row = self.heights[col] - 1
+        self.heights[col] = row
+        index = col * BB_HEIGHT + row
+        if self.bb_ai >> index & 1:
+            self.bb_ai ^= 1 << index
+            self.key ^= ZOBRIST_AI[index] ^ ZOBRIST_AI_TO_MOVE
+        else:
+            self.bb_player ^= 1 << index
+            self.key ^= ZOBRIST_PLAYER[index] ^ ZOBRIST_AI_TO_MOVE
+        return col
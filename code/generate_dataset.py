@@ -1,95 +1,48 @@
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
-import random
 
-ROW_COUNT = 6
-COLUMN_COUNT = 7
-PLAYER_PIECE = 1 
-AI_PIECE = -1    
-
-def create_board():
-    return np.zeros((ROW_COUNT, COLUMN_COUNT))
-
-def is_valid_location(board, col):
-    return board[ROW_COUNT-1][col] == 0
-
-def get_next_open_row(board, col):
-    for r in range(ROW_COUNT):
-        if board[r][col] == 0:
-            return r
-
-def drop_piece(board, row, col, piece):
-    board[row][col] = piece
-
-def winning_move(board, piece):
-    # Controllo Orizzontale
-    for c in range(COLUMN_COUNT-3):
-        for r in range(ROW_COUNT):
-            if board[r][c] == piece and board[r][c+1] == piece and board[r][c+2] == piece and board[r][c+3] == piece: return True
-    # Controllo Verticale
-    for c in range(COLUMN_COUNT):
-        for r in range(ROW_COUNT-3):
-            if board[r][c] == piece and board[r+1][c] == piece and board[r+2][c] == piece and board[r+3][c] == piece: return True
-    # Diagonale Positiva
-    for c in range(COLUMN_COUNT-3):
-        for r in range(ROW_COUNT-3):
-            if board[r][c] == piece and board[r+1][c+1] == piece and board[r+2][c+2] == piece and board[r+3][c+3] == piece: return True
-    # Diagonale Negativa
-    for c in range(COLUMN_COUNT-3):
-        for r in range(3, ROW_COUNT):
-            if board[r][c] == piece and board[r-1][c+1] == piece and board[r-2][c+2] == piece and board[r-3][c+3] == piece: return True
-    return False
-
-def get_valid_locations(board):
-    valid_locations = []
-    for col in range(COLUMN_COUNT):
-        if is_valid_location(board, col):
-            valid_locations.append(col)
-    return valid_locations
-
-def evaluate_window(window, piece):
-    score = 0
-    opp_piece = PLAYER_PIECE
-    if piece == PLAYER_PIECE: opp_piece = AI_PIECE
-
-    if window.count(piece) == 4: score += 100
-    elif window.count(piece) == 3 and window.count(0) == 1: score += 5
-    elif window.count(piece) == 2 and window.count(0) == 2: score += 2
-    if window.count(opp_piece) == 3 and window.count(0) == 1: score -= 4
-    return score
-
-def score_position(board, piece):
-    score = 0
-    center_array = [int(i) for i in list(board[:, COLUMN_COUNT//2])]
-    center_count = center_array.count(piece)
-    score += center_count * 3
-    
-    for r in range(ROW_COUNT):
-        row_array = [int(i) for i in list(board[r,:])]
-        for c in range(COLUMN_COUNT-3):
-            window = row_array[c:c+4]
-            score += evaluate_window(window, piece)
-    return score
+import game_logic as gl
+import ai_engines as ai
+import dataset_io as dio
+import position_cache as pc
+import solver as sv
 
 def minimax_score(board, depth, alpha, beta, maximizingPlayer):
-    valid_locations = get_valid_locations(board)
-    is_terminal = winning_move(board, PLAYER_PIECE) or winning_move(board, AI_PIECE) or len(valid_locations) == 0
+    # Punteggio incrementale dal punto di vista del Player, sulle sole finestre orizzontali
+    pos = ai.EvalPosition.from_board(board, not maximizingPlayer, gl.PLAYER_PIECE, gl.ROW_WINDOW_COUNT)
+    if gl.bb_winning_move(pos.bb_player): return 1000000
+    elif gl.bb_winning_move(pos.bb_ai): return -1000000
+    return _minimax_score_pos(pos, depth, alpha, beta, maximizingPlayer)
+
+def _minimax_score_pos(pos, depth, alpha, beta, maximizingPlayer):
+    # Il chiamante garantisce che nessuno abbia già vinto: si controlla solo l'ultima mossa
+    valid_locations = pos.valid_locations()
     
-    if depth == 0 or is_terminal:
-        if is_terminal:
-            if winning_move(board, PLAYER_PIECE): return 1000000
-            elif winning_move(board, AI_PIECE): return -1000000
-            else: return 0 
+    if len(valid_locations) == 0: return 0
+    if depth == 0: return pos.score
+
+    if depth == 1: # Foglie lette dalla valutazione incrementale, senza ricorsione
+        if maximizingPlayer:
+            frontier = ai.frontier_scores(pos, valid_locations, gl.PLAYER_PIECE, 1000000)
+            return max(frontier.values())
         else:
-            return score_position(board, PLAYER_PIECE)
+            frontier = ai.frontier_scores(pos, valid_locations, gl.AI_PIECE, -1000000)
+            return min(frontier.values())
 
     if maximizingPlayer:
         value = -float('inf')
         for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, PLAYER_PIECE)
-            new_score = minimax_score(b_copy, depth-1, alpha, beta, False)
+            if pos.play(col, gl.PLAYER_PIECE):
+                new_score = 1000000
+            else:
+                new_score = _minimax_score_pos(pos, depth-1, alpha, beta, False)
+            pos.undo()
             value = max(value, new_score)
             alpha = max(alpha, value)
             if alpha >= beta: break
@@ -97,69 +50,305 @@ def minimax_score(board, depth, alpha, beta, maximizingPlayer):
     else:
         value = float('inf')
         for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, AI_PIECE)
-            new_score = minimax_score(b_copy, depth-1, alpha, beta, True)
+            if pos.play(col, gl.AI_PIECE):
+                new_score = -1000000
+            else:
+                new_score = _minimax_score_pos(pos, depth-1, alpha, beta, True)
+            pos.undo()
             value = min(value, new_score)
             beta = min(beta, value)
             if alpha >= beta: break
         return value
 
 
-def generate_high_quality_data(num_samples=100000):
-    print(f"Inizio generazione di {num_samples} campioni sintetici.")
-    print("Utilizzo di Minimax per l'etichettatura automatica (Labeling)...")
-    
-    data = []
-    
-    for i in range(num_samples):
-        if i > 0 and i % 10000 == 0: print(f"Generati {i}/{num_samples}...")
-            
-        board = create_board()
-        # Simulazione stato di metà partita (State Sampling)
-        moves_made = random.randint(4, 24) 
-        
-        game_over_early = False
-        piece_to_move = PLAYER_PIECE 
+def solver_label(board, piece_to_move, solver=None):
+    # Etichetta esatta: chi vince con gioco perfetto (1 Player, -1 AI, 0 pareggio)
+    value = sv.solve_board(board, piece_to_move, solver)
+    if value == 0:
+        return 0
+    winner = piece_to_move if value > 0 else -piece_to_move
+    return 1 if winner == gl.PLAYER_PIECE else -1
 
-        for _ in range(moves_made):
-            valid_cols = get_valid_locations(board)
-            if not valid_cols: break 
-            
-            col = random.choice(valid_cols)
-            row = get_next_open_row(board, col)
-            drop_piece(board, row, col, piece_to_move)
-            
-            if winning_move(board, piece_to_move):
-                game_over_early = True
-                break
-            piece_to_move *= -1 
-
-        label = 0
-        if game_over_early:
-            if winning_move(board, PLAYER_PIECE): label = 1
-            elif winning_move(board, AI_PIECE): label = -1
+def label_position(board, piece_to_move, game_over_early, cache=None, solver_threshold=0, solver=None):
+    """Etichetta di una posizione campionata (1 Vince Player, -1 Vince AI, 0 Pareggio/Incerto).
+    Con una LabelCache le posizioni già viste (o speculari) non vengono ricercate di nuovo.
+    Le posizioni con al più solver_threshold celle vuote ricevono l'etichetta esatta del
+    risolutore invece della stima di Minimax (e non passano dalla cache)."""
+    label = 0
+    if game_over_early:
+        # Solo chi ha mosso per ultimo può aver vinto
+        label = 1 if piece_to_move == gl.PLAYER_PIECE else -1
+    elif int(np.count_nonzero(board == gl.EMPTY)) <= solver_threshold:
+        label = solver_label(board, piece_to_move, solver)
+    else:
+        cached = None
+        if cache is not None:
+            bb_player, bb_ai, _ = gl.board_to_bitboard(board)
+            cached = cache.get(bb_player, bb_ai)
+
+        if cached is not None:
+            label = cached
         else:
-            is_maximizing = (piece_to_move == PLAYER_PIECE)
+            is_maximizing = (piece_to_move == gl.PLAYER_PIECE)
             score = minimax_score(board, 3, -float('inf'), float('inf'), is_maximizing)
             
             if score > 50: label = 1      # Classe 1: Vince Player
             elif score < -50: label = -1  # Classe -1: Vince AI
             else: label = 0               # Classe 0: Pareggio/Incerto
 
-        # Flattening (da Matrice a Vettore)
-        flat_board = board.flatten().tolist()
-        flat_board.append(label)
-        data.append(flat_board)
+            if cache is not None:
+                cache.put(bb_player, bb_ai, label)
+    return label
+
+def generate_sample(rng, cache=None, solver_threshold=0, solver=None):
+    """Genera un campione (42 celle + etichetta) usando il generatore rng"""
+    board = gl.create_board()
+    # Simulazione stato di metà partita (State Sampling)
+    moves_made = rng.randint(4, 24) 
+    
+    game_over_early = False
+    piece_to_move = gl.PLAYER_PIECE 
+
+    for _ in range(moves_made):
+        valid_cols = gl.get_valid_locations(board)
+        if not valid_cols: break 
+        
+        col = rng.choice(valid_cols)
+        row = gl.get_next_open_row(board, col)
+        gl.drop_piece(board, row, col, piece_to_move)
+        
+        if gl.winning_move_at(board, row, col):
+            game_over_early = True
+            break
+        piece_to_move *= -1 
+
+    label = label_position(board, piece_to_move, game_over_early, cache, solver_threshold, solver)
+
+    # Flattening (da Matrice a Vettore)
+    flat_board = board.flatten().tolist()
+    flat_board.append(label)
+    return flat_board
+
+def sample_positions(rng, n, min_moves=4, max_moves=24):
+    """Campionamento vettoriale: n partite casuali avanzano insieme, una mossa per volta,
+    ognuna fino alla propria lunghezza (tra min_moves e max_moves) o alla vittoria.
+    rng è un numpy Generator. Restituisce (board (n, 6, 7), pezzo al tratto, partita finita);
+    per le partite finite il pezzo al tratto è quello del vincitore, come in generate_sample."""
+    boards = gl.create_boards(n)
+    moves_made = rng.integers(min_moves, max_moves + 1, size=n)
+    pieces = np.full(n, gl.PLAYER_PIECE)
+    game_over = np.zeros(n, dtype=bool)
+
+    for ply in range(max_moves):
+        active = np.flatnonzero((moves_made > ply) & ~game_over)
+        if active.size == 0:
+            break
+        batch = boards[active]
+        # Colonna casuale uniforme tra quelle valide: massimo di valori casuali sulle sole colonne libere
+        noise = rng.random((active.size, gl.COLUMN_COUNT))
+        noise[~gl.get_valid_locations_mask(batch)] = -1
+        cols = noise.argmax(axis=1)
+        rows = gl.get_next_open_rows(batch, cols)
+        gl.drop_pieces(batch, rows, cols, pieces[active])
+        boards[active] = batch
 
-    # Salvataggio CSV
-    cols = [f"pos_{i}" for i in range(42)] + ["winner"]
-    df = pd.DataFrame(data, columns=cols)
+        won = gl.winning_moves(batch, pieces[active])
+        game_over[active[won]] = True
+        pieces[active[~won]] *= -1
+    return boards, pieces, game_over
+
+def generate_samples(rng, n, cache=None, solver_threshold=0, solver=None):
+    """Come n chiamate a generate_sample, ma con le posizioni da sample_positions"""
+    boards, pieces, game_over = sample_positions(rng, n)
+    rows = []
+    for board, piece, done in zip(boards, pieces.tolist(), game_over.tolist()):
+        label = label_position(board, piece, done, cache, solver_threshold, solver)
+        rows.append(board.flatten().tolist() + [label])
+    return rows
+
+# I campioni sono generati a blocchi di dimensione fissa, ognuno con un seed derivato
+# dal seed principale: il risultato non dipende da quanti processi lavorano.
+BLOCK_SIZE = 1000
+
+def block_seed(seed, block):
+    return f"{seed}:{block}"
+
+# Ogni processo tiene la propria cache delle etichette (caricata dal file, se presente)
+# e restituisce al processo principale solo le voci nuove insieme al blocco.
+_worker_cache = None
+_worker_solver_threshold = 0
+_worker_sampler = "batched"
+
+SAMPLERS = ["batched", "sequential"]
+
+def _init_generator_worker(cache_path, solver_threshold=0, sampler="batched"):
+    global _worker_cache, _worker_solver_threshold, _worker_sampler
+    _worker_cache = pc.LabelCache(cache_path)
+    _worker_solver_threshold = solver_threshold
+    _worker_sampler = sampler
+
+def generate_block(seed, block, size):
+    start = time.perf_counter()
+    rng = random.Random(block_seed(seed, block))
+    hits, misses = _worker_cache.hits, _worker_cache.misses
+    solver = sv.default_solver()
+    if _worker_sampler == "batched":
+        np_rng = np.random.default_rng(rng.getrandbits(128))
+        rows = generate_samples(np_rng, size, _worker_cache, _worker_solver_threshold, solver)
+    else:
+        rows = [generate_sample(rng, _worker_cache, _worker_solver_threshold, solver) for _ in range(size)]
+    cache_stats = (_worker_cache.hits - hits, _worker_cache.misses - misses, _worker_cache.take_new_entries())
+    return block, rows, os.getpid(), time.perf_counter() - start, cache_stats
+
+def generate_blocks(num_samples, workers, seed, cache, solver_threshold=0, sampler="batched", first_block=0):
+    """Produce i blocchi (indice, righe) in ordine appena disponibili, stampando l'avanzamento per processo.
+    La numerazione parte da first_block: riprendere da un blocco dà gli stessi campioni di un'unica esecuzione."""
+    sizes = [min(BLOCK_SIZE, num_samples - start) for start in range(0, num_samples, BLOCK_SIZE)]
+    pending = {}
+    next_block = first_block
+    worker_stats = {} # pid -> [campioni, secondi]
+    done = 0
+    start = time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_generator_worker,
+                               initargs=(cache.path, solver_threshold, sampler))
+    try:
+        futures = [pool.submit(generate_block, seed, first_block + i, size) for i, size in enumerate(sizes)]
+        for future in as_completed(futures):
+            block, rows, pid, elapsed, (hits, misses, new_labels) = future.result()
+            pending[block] = rows
+            cache.hits += hits
+            cache.misses += misses
+            cache.merge(new_labels)
+            stats = worker_stats.setdefault(pid, [0, 0.0])
+            stats[0] += len(rows)
+            stats[1] += elapsed
+            done += len(rows)
+            print(f"Generati {done}/{num_samples} ({done / (time.perf_counter() - start):.0f} campioni/s) "
+                  f"- worker {pid}: {stats[0]} campioni, {stats[0] / stats[1]:.0f} campioni/s "
+                  f"- cache {cache.hit_rate():.1%}")
+
+            while next_block in pending:
+                yield next_block, pending.pop(next_block)
+                next_block += 1
+    finally:
+        # Se la generazione viene interrotta i blocchi non ancora iniziati vengono annullati
+        pool.shutdown(cancel_futures=True)
+
+# Checkpoint accanto al dataset (<output>.ckpt): seed, impostazioni, primo blocco da generare
+# e campioni già scritti. Lo stato dei generatori casuali è tutto qui: ogni blocco ha un
+# seed derivato da (seed, indice del blocco).
+def checkpoint_path(path):
+    return path + ".ckpt"
+
+def load_checkpoint(path):
+    ckpt = checkpoint_path(path)
+    if not os.path.exists(ckpt):
+        return None
+    with open(ckpt) as f:
+        return json.load(f)
+
+def save_checkpoint(path, state):
+    ckpt = checkpoint_path(path)
+    with open(ckpt + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(ckpt + ".tmp", ckpt) # Scrittura atomica
+
+def generate_high_quality_data(num_samples=100000, workers=None, seed=None, path=dio.DATASET_PATH, csv_path=None,
+                               cache_path=None, solver_threshold=0, sampler="batched", resume=False, append=False):
+    """Genera num_samples campioni in path, con un checkpoint dopo ogni blocco.
+    resume: continua una generazione interrotta con le impostazioni del checkpoint.
+    append: aggiunge num_samples campioni nuovi a un dataset esistente."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    state = load_checkpoint(path)
+    rows_done = 0
+    first_block = 0
+
+    if resume:
+        if state is None:
+            raise ValueError(f"Nessun checkpoint da riprendere per '{path}'")
+        if state["complete"]:
+            print(f"La generazione di '{path}' è già completa ({state['rows']} campioni).")
+            return
+        seed, sampler, solver_threshold = state["seed"], state["sampler"], state["solver_threshold"]
+        rows_done, first_block = state["rows"], state["next_block"]
+        if dio.count_rows(path) < rows_done:
+            raise ValueError(f"'{path}' ha meno campioni di quelli indicati dal checkpoint")
+        dio.truncate_rows(path, rows_done)
+        target = state["target_rows"]
+        print(f"Ripresa dal blocco {first_block}: {rows_done}/{target} campioni già generati.")
+    elif append and os.path.exists(path):
+        if state is not None and not state["complete"]:
+            raise ValueError(f"La generazione di '{path}' è stata interrotta: usa --resume")
+        rows_done = dio.count_rows(path)
+        if state is not None:
+            # Si prosegue la stessa sequenza di blocchi: i nuovi campioni non ripetono i vecchi
+            if state["rows"] != rows_done:
+                raise ValueError(f"'{path}' ha {rows_done} campioni ma il checkpoint ne indica {state['rows']}")
+            seed, first_block = state["seed"], state["next_block"]
+        target = rows_done + num_samples
+        print(f"Aggiunta di {num_samples} campioni ai {rows_done} di '{path}'.")
+    else:
+        append = False
+        target = num_samples
+
+    if seed is None:
+        seed = random.randrange(2**32)
+    state = {"seed": seed, "sampler": sampler, "solver_threshold": solver_threshold, "next_block": first_block,
+             "rows": rows_done, "target_rows": target, "complete": False}
+    save_checkpoint(path, state)
+
+    print(f"Inizio generazione di {target - rows_done} campioni sintetici su {workers} processi (seed {seed}).")
+    print("Utilizzo di Minimax per l'etichettatura automatica (Labeling)...")
+    if solver_threshold:
+        print(f"Posizioni con al più {solver_threshold} celle vuote etichettate dal risolutore esatto.")
     
-    df.to_csv("connect4_dataset_hq.csv", index=False)
+    cache = pc.LabelCache(cache_path)
+
+    # I blocchi vengono scritti su disco man mano che arrivano, ognuno seguito da un checkpoint
+    with dio.DatasetWriter(path, append=resume or append) as writer:
+        for block, rows in generate_blocks(target - rows_done, workers, seed, cache, solver_threshold, sampler,
+                                           first_block):
+            writer.write_rows(rows)
+            cache.flush()
+            state["next_block"] = block + 1
+            state["rows"] += len(rows)
+            save_checkpoint(path, state)
+    state["complete"] = True
+    save_checkpoint(path, state)
+
     print("\n--- COMPLETATO ---")
-    print("Dataset salvato come 'connect4_dataset_hq.csv'")
+    print(f"Dataset salvato come '{path}'")
+    print(f"Cache etichette: {cache.hits} hit, {cache.misses} miss ({cache.hit_rate():.1%}), {len(cache)} posizioni")
+
+    if csv_path:
+        X, y = dio.load_xy(path)
+        cols = [f"pos_{i}" for i in range(42)] + ["winner"]
+        df = pd.DataFrame(np.column_stack([X, y]), columns=cols)
+        df.to_csv(csv_path, index=False)
+        print(f"Copia CSV salvata come '{csv_path}'")
 
 if __name__ == "__main__":
-    generate_high_quality_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generazione del dataset etichettato con Minimax")
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None, help="Processi (default: tutti i core)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed principale per un dataset riproducibile")
+    parser.add_argument("--output", default=dio.DATASET_PATH, help="File binario di destinazione")
+    parser.add_argument("--csv", nargs="?", const=dio.CSV_PATH, default=None, help="Esporta anche in CSV")
+    parser.add_argument("--cache-file", default=None, help="Database SQLite per riusare le etichette tra esecuzioni")
+    parser.add_argument("--solver-threshold", type=int, default=0,
+                        help="Etichette esatte (risolutore) per le posizioni con al più N celle vuote")
+    parser.add_argument("--sampler", choices=SAMPLERS, default="batched",
+                        help="batched: partite casuali avanzate in blocco con numpy; sequential: una alla volta "
+                             "(riproduce i dataset generati con le versioni precedenti)")
+    parser.add_argument("--resume", action="store_true", help="Riprende una generazione interrotta dal checkpoint")
+    parser.add_argument("--append", action="store_true", help="Aggiunge --samples campioni a un dataset esistente")
+    args = parser.parse_args()
+    if args.resume and args.append:
+        parser.error("--resume e --append non possono essere usati insieme")
+    try:
+        generate_high_quality_data(args.samples, args.workers, args.seed, args.output, args.csv, args.cache_file,
+                                   args.solver_threshold, args.sampler, args.resume, args.append)
+    except ValueError as e:
+        parser.error(str(e))
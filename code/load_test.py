@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import numpy as np
+
+import game_logic as gl
+import arena
+
+# Client di carico per move_server.py: concurrency connessioni keep-alive inviano in
+# parallelo requests richieste POST /move su posizioni casuali con l'AI al tratto.
+
+def random_positions(n, seed=0, min_plies=1, max_plies=15):
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(n):
+        plies = rng.randrange(min_plies, max_plies + 1, 2) # Dispari: tocca all'AI
+        board = gl.create_board()
+        piece = gl.PLAYER_PIECE
+        for col in arena.random_opening(rng, plies):
+            gl.drop_piece(board, gl.get_next_open_row(board, col), col, piece)
+            piece *= -1
+        positions.append(board.astype(int).tolist())
+    return positions
+
+async def _request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def _client(host, port, jobs, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while jobs:
+            payload = jobs.pop()
+            start = time.perf_counter()
+            status, response = await _request(reader, writer, host, "POST", "/move", payload)
+            results.append((status, time.perf_counter() - start, response))
+    finally:
+        writer.close()
+
+async def run_load_test(host="127.0.0.1", port=8765, requests=1000, concurrency=32, engine="mlp",
+                        think_time_ms=None, depth=None, budget_ms=None, seed=0):
+    payloads = []
+    for board in random_positions(requests, seed):
+        payload = {"board": board, "engine": engine}
+        for name, value in (("think_time_ms", think_time_ms), ("depth", depth), ("budget_ms", budget_ms)):
+            if value is not None:
+                payload[name] = value
+        payloads.append(payload)
+
+    results = []
+    jobs = payloads[::-1]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, jobs, results) for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server_stats = await _request(reader, writer, host, "GET", "/stats")
+    writer.close()
+
+    latencies = np.array([latency for status, latency, _ in results if status == 200]) * 1000
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    batch_sizes = [r["batch_size"] for status, _, r in results if status == 200 and "batch_size" in r]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    report = {"engine": engine, "requests": requests, "concurrency": concurrency, "elapsed_s": round(elapsed, 3),
+              "throughput_rps": round(len(results) / elapsed, 1), "statuses": statuses,
+              "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+              "max_ms": round(float(latencies.max()), 3) if len(latencies) else 0.0,
+              "mean_batch": round(float(np.mean(batch_sizes)), 2) if batch_sizes else None,
+              "server": server_stats}
+
+    print(f"Motore {engine}: {requests} richieste, {concurrency} connessioni, {elapsed:.2f} s")
+    print(f"Throughput: {report['throughput_rps']:.1f} richieste/s   Esiti: {statuses}")
+    print(f"Latenza (ms): p50 {p50:.2f} | p95 {p95:.2f} | p99 {p99:.2f} | max {report['max_ms']:.2f}")
+    if batch_sizes:
+        print(f"Dimensione media dei batch MLP: {report['mean_batch']:.2f}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test di carico per move_server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Connessioni simultanee")
+    parser.add_argument("--engine", choices=["minimax", "mlp"], default="mlp")
+    parser.add_argument("--think-time-ms", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--budget-ms", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Salva il resoconto in JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args.host, args.port, args.requests, args.concurrency, args.engine,
+                                       args.think_time_ms, args.depth, args.budget_ms, args.seed))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResoconto salvato in '{args.output}'")
@@ -0,0 +1,47 @@
+import numpy as np
+
+# Forward pass di un MLPClassifier addestrato, in puro numpy: in inferenza non
+# serve scikit-learn (niente validazione dell'input ad ogni chiamata).
+_ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': np.tanh,
+    'logistic': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'identity': lambda x: x,
+}
+
+class NumpyMLP:
+    """Copia dei pesi (coefs_/intercepts_) di un MLPClassifier con predict/predict_proba vettoriali"""
+
+    def __init__(self, coefs, intercepts, classes, activation='relu'):
+        self.coefs = [np.asarray(w, dtype=np.float64) for w in coefs]
+        self.intercepts = [np.asarray(b, dtype=np.float64) for b in intercepts]
+        self.classes_ = np.asarray(classes)
+        self.activation = activation
+
+    @classmethod
+    def from_sklearn(cls, model):
+        return cls(model.coefs_, model.intercepts_, model.classes_, model.activation)
+
+    def _logits(self, X):
+        h = np.asarray(X, dtype=np.float64)
+        if h.ndim == 1:
+            h = h.reshape(1, -1)
+        activation = _ACTIVATIONS[self.activation]
+        for w, b in zip(self.coefs[:-1], self.intercepts[:-1]):
+            h = activation(h @ w + b)
+        return h @ self.coefs[-1] + self.intercepts[-1]
+
+    def predict_proba(self, X):
+        logits = self._logits(X)
+        if logits.shape[1] == 1: # Classificazione binaria: uscita logistica
+            p = 1.0 / (1.0 + np.exp(-logits))
+            return np.hstack([1 - p, p])
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        logits = self._logits(X)
+        if logits.shape[1] == 1:
+            return self.classes_[(logits[:, 0] > 0).astype(int)]
+        return self.classes_[logits.argmax(axis=1)]
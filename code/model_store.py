@@ -0,0 +1,221 @@
+import hashlib
+import json
+import math
+import os
+import time
+import numpy as np
+
+import dataset_io as dio
+from mlp_numpy import NumpyMLP
+
+# Archivio dei modelli addestrati: pesi + metadati in un file .npz, identificato da
+# un hash del dataset e degli iperparametri. Se la chiave non cambia il modello
+# viene caricato dal disco invece di essere riaddestrato.
+ARTIFACT_VERSION = 1
+MODELS_DIR = "models"
+
+# Configurazione condivisa da analysis_mlp.py e app.py
+MLP_PARAMS = {
+    "hidden_layer_sizes": (64, 32),
+    "activation": "relu",
+    "max_iter": 500,
+    "random_state": 42,
+    "early_stopping": True, # Importante per vedere la validation loss
+    "validation_fraction": 0.1,
+}
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+# Addestramento out-of-core: il dataset viene letto a blocchi di chunk_rows righe dal memmap
+# e la rete aggiornata con partial_fit, un'epoca dopo l'altra. Oltre STREAMING_MIN_ROWS
+# campioni è l'unica modalità usata, perché fit in memoria non sarebbe più praticabile.
+STREAM_PARAMS = {
+    "chunk_rows": 100000,
+    "max_epochs": 50,
+    "patience": 5, # Epoche senza miglioramento sulla validazione prima di fermarsi
+    "tol": 1e-4,
+    "validation_fraction": 0.1,
+}
+STREAMING_MIN_ROWS = 2_000_000
+CLASSES = np.array([-1, 0, 1])
+
+def file_hash(path, chunk_size=2**20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def artifact_key(dataset_path, params=MLP_PARAMS, test_size=TEST_SIZE, split_seed=SPLIT_SEED):
+    config = {"version": ARTIFACT_VERSION, "dataset": file_hash(dataset_path), "params": params,
+              "test_size": test_size, "split_seed": split_seed}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+def training_params(streaming=False):
+    # Parametri che identificano l'artefatto: con lo streaming contano anche quelli dei blocchi
+    return dict(MLP_PARAMS, streaming=STREAM_PARAMS) if streaming else MLP_PARAMS
+
+def artifact_path(key, models_dir=MODELS_DIR):
+    return os.path.join(models_dir, f"mlp_{key}.npz")
+
+def save_model(model, key, metadata, models_dir=MODELS_DIR):
+    """Salva un NumpyMLP (o un MLPClassifier) con i suoi metadati; restituisce il percorso"""
+    if not isinstance(model, NumpyMLP):
+        model = NumpyMLP.from_sklearn(model)
+    os.makedirs(models_dir, exist_ok=True)
+    metadata = dict(metadata, key=key, version=ARTIFACT_VERSION, activation=model.activation,
+                    created_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+
+    arrays = {f"coef_{i}": w for i, w in enumerate(model.coefs)}
+    arrays.update({f"intercept_{i}": b for i, b in enumerate(model.intercepts)})
+    path = artifact_path(key, models_dir)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, classes=model.classes_, metadata=json.dumps(metadata), **arrays)
+    os.replace(tmp_path, path) # Scrittura atomica: altri processi non vedono file parziali
+    return path
+
+def load_model(key, models_dir=MODELS_DIR):
+    """Restituisce (NumpyMLP, metadati) oppure None se l'artefatto non esiste"""
+    path = artifact_path(key, models_dir)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        metadata = json.loads(str(data["metadata"]))
+        if metadata.get("version") != ARTIFACT_VERSION:
+            return None
+        n_layers = sum(1 for name in data.files if name.startswith("coef_"))
+        coefs = [data[f"coef_{i}"] for i in range(n_layers)]
+        intercepts = [data[f"intercept_{i}"] for i in range(n_layers)]
+        model = NumpyMLP(coefs, intercepts, data["classes"], metadata["activation"])
+    return model, metadata
+
+def train(X, y):
+    """Split e addestramento con la configurazione condivisa.
+    Restituisce (mlp, X_train, X_test, y_train, y_test)."""
+    # scikit-learn serve solo per addestrare: caricare un artefatto non lo importa
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.model_selection import train_test_split
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+    mlp = MLPClassifier(**MLP_PARAMS)
+    mlp.fit(X_train, y_train)
+    return mlp, X_train, X_test, y_train, y_test
+
+def split_masks(chunk, n, stream=STREAM_PARAMS):
+    """Assegnazione deterministica delle righe di un blocco a (test, validazione, training)"""
+    u = np.random.default_rng([SPLIT_SEED, chunk]).random(n)
+    val_end = TEST_SIZE + (1 - TEST_SIZE) * stream["validation_fraction"]
+    test = u < TEST_SIZE
+    validation = (u >= TEST_SIZE) & (u < val_end)
+    return test, validation, u >= val_end
+
+def iter_split(path, subset, stream=STREAM_PARAMS, order=None):
+    """Scorre il dataset a blocchi restituendo (X, y) della sola parte subset
+    ("train", "validation" o "test"): in memoria c'è un blocco alla volta."""
+    data = dio.open_dataset(path)
+    chunk_rows = stream["chunk_rows"]
+    index = ("test", "validation", "train").index(subset)
+    for chunk in (order if order is not None else range(math.ceil(len(data) / chunk_rows))):
+        block = np.asarray(data[chunk * chunk_rows:(chunk + 1) * chunk_rows])
+        rows = block[split_masks(chunk, len(block), stream)[index]]
+        yield rows[:, :dio.CELLS].astype(np.float64), rows[:, dio.CELLS]
+
+def train_streaming(path, params=MLP_PARAMS, stream=STREAM_PARAMS, verbose=True):
+    """Addestramento a blocchi con partial_fit ed early stopping sulla validazione.
+    Restituisce (NumpyMLP dell'epoca migliore, {"loss": [...], "validation_accuracy": [...]})."""
+    from sklearn.neural_network import MLPClassifier
+
+    # early_stopping di scikit-learn non vale con partial_fit: è gestito qui, epoca per epoca
+    mlp = MLPClassifier(**{k: v for k, v in params.items()
+                           if k not in ("max_iter", "early_stopping", "validation_fraction")})
+    rng = np.random.default_rng(params.get("random_state"))
+    n_chunks = math.ceil(dio.count_rows(path) / stream["chunk_rows"])
+    history = {"loss": [], "validation_accuracy": []}
+    best, best_score, stale = None, -1.0, 0
+
+    for epoch in range(stream["max_epochs"]):
+        loss_sum, rows = 0.0, 0
+        for X, y in iter_split(path, "train", stream, order=rng.permutation(n_chunks)):
+            perm = rng.permutation(len(X))
+            mlp.partial_fit(X[perm], y[perm], classes=CLASSES)
+            loss_sum += mlp.loss_ * len(X)
+            rows += len(X)
+        history["loss"].append(float(loss_sum / rows))
+
+        correct, total = 0, 0
+        for X, y in iter_split(path, "validation", stream):
+            correct += int(np.count_nonzero(mlp.predict(X) == y))
+            total += len(y)
+        score = correct / total if total else 0.0
+        history["validation_accuracy"].append(score)
+        if verbose:
+            print(f"Epoca {epoch + 1}: loss {history['loss'][-1]:.4f}, validazione {score:.2%}")
+
+        if score > best_score + stream["tol"]:
+            # Copia dei pesi: partial_fit li aggiorna sul posto
+            best = NumpyMLP([w.copy() for w in mlp.coefs_], [b.copy() for b in mlp.intercepts_],
+                            mlp.classes_, mlp.activation)
+            best_score, stale = score, 0
+        else:
+            stale += 1
+            if stale >= stream["patience"]:
+                break
+    return best, history
+
+def evaluation_metadata(mlp, X_train, X_test, y_test, dataset_path):
+    accuracy = float(np.mean(mlp.predict(X_test) == y_test))
+    return {"accuracy": accuracy, "train_samples": len(X_train), "test_samples": len(X_test),
+            "dataset": os.path.basename(dataset_path), "params": MLP_PARAMS}
+
+def streaming_metadata(model, history, dataset_path, stream=STREAM_PARAMS):
+    # Accuratezza sul test set calcolata a blocchi
+    correct, total = 0, 0
+    for X, y in iter_split(dataset_path, "test", stream):
+        correct += int(np.count_nonzero(model.predict(X) == y))
+        total += len(y)
+    return {"accuracy": correct / total if total else 0.0, "test_samples": total, "epochs": len(history["loss"]),
+            "dataset": os.path.basename(dataset_path), "params": training_params(True)}
+
+def use_streaming(dataset_path):
+    return dio.count_rows(dataset_path) >= STREAMING_MIN_ROWS
+
+def dataset_artifact_key(dataset_path=dio.DATASET_PATH):
+    """Chiave del modello addestrato sul dataset con la modalità scelta in base alla dimensione"""
+    return artifact_key(dataset_path, training_params(use_streaming(dataset_path)))
+
+def load_dataset_artifact(dataset_path=dio.DATASET_PATH, models_dir=MODELS_DIR):
+    """(modello, metadati) addestrato sul dataset in una delle due modalità, oppure None.
+    Prima la modalità automatica, poi l'altra: analysis_mlp.py può forzarla con
+    --streaming / --in-memory e il modello va trovato comunque."""
+    streaming = use_streaming(dataset_path)
+    for mode in (streaming, not streaming):
+        artifact = load_model(artifact_key(dataset_path, training_params(mode)), models_dir)
+        if artifact is not None:
+            return artifact
+    return None
+
+def load_trained(dataset_path=dio.DATASET_PATH, models_dir=MODELS_DIR):
+    """Modello già addestrato sul dataset attuale, senza mai avviare un training
+    (per benchmark, arena e server): None se il dataset o l'artefatto mancano"""
+    if not os.path.exists(dataset_path):
+        return None
+    artifact = load_dataset_artifact(dataset_path, models_dir)
+    return artifact[0] if artifact else None
+
+def load_or_train(dataset_path=dio.DATASET_PATH, models_dir=MODELS_DIR):
+    """Carica il modello corrispondente al dataset attuale, addestrandolo solo se manca"""
+    X, y = dio.load_xy(dataset_path)
+    streaming = use_streaming(dataset_path)
+    key = dataset_artifact_key(dataset_path)
+    artifact = load_dataset_artifact(dataset_path, models_dir)
+    if artifact is not None:
+        return artifact
+
+    if streaming:
+        model, history = train_streaming(dataset_path)
+        save_model(model, key, streaming_metadata(model, history, dataset_path), models_dir)
+    else:
+        mlp, X_train, X_test, y_train, y_test = train(X, y)
+        metadata = evaluation_metadata(mlp, X_train, X_test, y_test, dataset_path)
+        save_model(mlp, key, metadata, models_dir)
+    return load_model(key, models_dir)
@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+
+import game_logic as gl
+import ai_engines as ai
+import model_store as ms
+
+# Servizio HTTP/JSON senza interfaccia per le mosse dei motori (asyncio, senza framework web).
+#   POST /move  {"board": 6x7 (riga 0 in basso), "engine": "minimax" | "mlp",
+#                "think_time_ms": ..., "depth": ..., "budget_ms": ...}
+#               -> {"move": colonna, "engine": ..., "stats": {...}, "queue_ms": ..., "elapsed_ms": ...}
+#   GET  /stats -> contatori del server
+# Il motore muove sempre come AI_PIECE. Minimax gira in un pool di processi; le richieste
+# MLP che arrivano insieme vengono raccolte in un'unica predict (get_neural_moves).
+# budget_ms limita il tempo totale della richiesta, attesa in coda compresa: oltre il
+# limite la risposta è 504.
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MS = 2000
+DEFAULT_THINK_TIME_MS = 250
+BUDGET_MARGIN = 0.05 # Secondi lasciati per coda del pool e risposta dopo la ricerca a tempo
+MAX_BODY_BYTES = 64 * 1024
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def parse_board(data):
+    if not isinstance(data, dict):
+        raise RequestError(400, "Il corpo deve essere un oggetto JSON")
+    try:
+        board = np.asarray(data.get("board"), dtype=np.float64)
+    except (TypeError, ValueError):
+        board = None
+    if board is None or board.shape != (gl.ROW_COUNT, gl.COLUMN_COUNT):
+        raise RequestError(400, f"'board' deve essere una matrice numerica {gl.ROW_COUNT}x{gl.COLUMN_COUNT}")
+    if not np.isin(board, (gl.EMPTY, gl.PLAYER_PIECE, gl.AI_PIECE)).all():
+        raise RequestError(400, "Valori ammessi nella board: 0, 1 (Player), -1 (AI)")
+
+    # Posizione raggiungibile: nessuna pedina sopra una cella vuota (board_to_bitboard si
+    # fida della gravità) e l'AI al tratto, che abbia iniziato lei o il Player
+    occupied = board != gl.EMPTY
+    if (occupied[1:] & ~occupied[:-1]).any():
+        raise RequestError(400, "Pedina sospesa sopra una cella vuota")
+    if int((board == gl.PLAYER_PIECE).sum() - (board == gl.AI_PIECE).sum()) not in (0, 1):
+        raise RequestError(400, "Numero di pedine non valido: deve toccare all'AI (-1)")
+    bb_player, bb_ai, _ = gl.board_to_bitboard(board)
+    if gl.bb_winning_move(bb_player) or gl.bb_winning_move(bb_ai):
+        raise RequestError(400, "La partita è già conclusa: c'è un quattro in fila")
+    if not gl.get_valid_locations(board):
+        raise RequestError(400, "La board è piena")
+    return board
+
+def _number(data, name, default, kind=float):
+    try:
+        return kind(data.get(name, default))
+    except (TypeError, ValueError, OverflowError):
+        raise RequestError(400, f"'{name}' deve essere un numero")
+
+def _duration(data, name, default):
+    # Tempi in millisecondi: NaN, infinito o valori non positivi renderebbero la deadline inutile
+    value = _number(data, name, default)
+    if not math.isfinite(value) or value <= 0:
+        raise RequestError(400, f"'{name}' deve essere un numero positivo di millisecondi")
+    return value / 1000
+
+def _minimax_job(board, think_time, depth, deadline):
+    # Eseguito nel pool: deadline è un istante time.time(), valido tra processi.
+    # Anche con depth la ricerca è a tempo (limitata a depth), così resta nel budget.
+    remaining = deadline - time.time() - BUDGET_MARGIN
+    if remaining <= 0: # Scaduta in coda: il chiamante ha già risposto 504
+        return None, None
+    if depth is not None:
+        think_time = remaining
+    stats = ai.SearchStats()
+    col = ai.get_minimax_move(board, think_time=min(think_time, remaining), depth=depth, stats=stats)
+    return col, stats.as_dict()
+
+class NeuralBatcher:
+    """Raccoglie le richieste MLP per al più window secondi (o max_batch board) e le
+    valuta con una sola chiamata a get_neural_moves in un thread separato"""
+
+    def __init__(self, model, window=0.005, max_batch=64):
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.boards = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def move(self, board):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((board, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            end = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = end - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [(board, future) for board, future in batch if not future.done()] # Scadute in coda
+            if not batch:
+                continue
+            try:
+                moves = await loop.run_in_executor(self.executor, ai.get_neural_moves, self.model,
+                                                   [board for board, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.boards += len(batch)
+            for (_, future), col in zip(batch, moves):
+                if not future.done():
+                    future.set_result((col, len(batch)))
+
+class MoveServer:
+    def __init__(self, workers=None, model=None, batch_window=0.005, max_batch=64):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.batcher = NeuralBatcher(model, batch_window, max_batch) if model is not None else None
+        self.counters = {"requests": 0, "errors": 0, "timeouts": 0}
+        self.latencies = {"minimax": [], "mlp": []}
+
+    async def handle_move(self, data):
+        received = time.time()
+        board = parse_board(data)
+        engine = data.get("engine", "minimax")
+        if not isinstance(engine, str) or engine not in self.latencies:
+            raise RequestError(400, f"Motore sconosciuto: {engine!r} (usa minimax o mlp)")
+        budget = _duration(data, "budget_ms", DEFAULT_BUDGET_MS)
+        deadline = received + budget
+
+        response = {"engine": engine}
+        try:
+            if engine == "mlp":
+                if self.batcher is None:
+                    raise RequestError(503, "Nessun modello MLP salvato: esegui prima 'analysis_mlp.py'")
+                col, batch_size = await asyncio.wait_for(self.batcher.move(board), budget)
+                response["batch_size"] = batch_size
+            else:
+                depth = data.get("depth")
+                if depth is not None:
+                    depth = _number(data, "depth", None, int)
+                    if depth < 1:
+                        raise RequestError(400, "'depth' deve essere almeno 1")
+                think_time = _duration(data, "think_time_ms", DEFAULT_THINK_TIME_MS)
+                job = asyncio.get_running_loop().run_in_executor(self.pool, _minimax_job, board, think_time, depth, deadline)
+                col, stats = await asyncio.wait_for(job, budget)
+                if stats is None: # Il processo l'ha trovata già scaduta
+                    raise asyncio.TimeoutError
+                response["stats"] = stats
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise RequestError(504, f"Budget di {budget * 1000:.0f} ms superato")
+
+        elapsed = time.time() - received
+        self.latencies[engine].append(elapsed)
+        response["move"] = None if col is None else int(col)
+        response["elapsed_ms"] = round(elapsed * 1000, 3)
+        if "stats" in response:
+            response["queue_ms"] = round(max(0.0, elapsed - response["stats"]["elapsed"]) * 1000, 3)
+        return response
+
+    def stats(self):
+        report = dict(self.counters)
+        for engine, latencies in self.latencies.items():
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (0.0, 0.0, 0.0)
+            report[engine] = {"moves": len(latencies), "p50_ms": round(p50, 3), "p95_ms": round(p95, 3),
+                              "p99_ms": round(p99, 3)}
+        if self.batcher is not None:
+            report["mlp"]["batches"] = self.batcher.batches
+            report["mlp"]["mean_batch"] = round(self.batcher.boards / self.batcher.batches, 2) if self.batcher.batches else 0.0
+        return report
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 minimale con keep-alive: una richiesta alla volta per connessione
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "Richiesta troppo grande"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._dispatch(method, path.split("?")[0], body)
+                keep_alive = headers.get("connection", "").lower() != "close" and version.strip() == "HTTP/1.1"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        self.counters["requests"] += 1
+        try:
+            if path == "/move" and method == "POST":
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise RequestError(400, "Corpo JSON non valido")
+                return 200, await self.handle_move(data)
+            if path == "/stats" and method == "GET":
+                return 200, self.stats()
+            raise RequestError(404, f"{method} {path} non disponibile")
+        except RequestError as e:
+            if e.status != 504:
+                self.counters["errors"] += 1
+            return e.status, {"error": str(e)}
+        except Exception: # Errore del server: la connessione resta utilizzabile
+            self.counters["errors"] += 1
+            logger.exception("Errore durante %s %s", method, path)
+            return 500, {"error": "Errore interno del server"}
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode()
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                   500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}
+        head = (f"HTTP/1.1 {status} {reasons.get(status, '')}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        if self.batcher is not None:
+            self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Server in ascolto su http://{host}:{port} (POST /move, GET /stats)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self.batcher is not None:
+                await self.batcher.stop()
+            self.pool.shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servizio HTTP/JSON per le mosse dei motori")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Processi per Minimax (default: tutti i core)")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0,
+                        help="Attesa massima per raccogliere richieste MLP nello stesso batch")
+    parser.add_argument("--max-batch", type=int, default=64, help="Board MLP per batch")
+    args = parser.parse_args()
+
+    model = ms.load_trained()
+    if model is None:
+        print("Nessun modello MLP salvato: il motore 'mlp' non sarà disponibile")
+    server = MoveServer(args.workers, model, args.batch_window_ms / 1000, args.max_batch)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
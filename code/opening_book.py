@@ -0,0 +1,118 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import game_logic as gl
+
+# Libro delle aperture: per ogni posizione con l'AI al tratto entro le prime
+# plies mosse, la colonna scelta da una ricerca profonda. Le posizioni sono
+# canonicalizzate per simmetria (gl.canonical_key), il file è binario: un header
+# di 16 byte e record (bb_player uint64, bb_ai uint64, colonna int8, profondità uint8).
+MAGIC = b"C4OB"
+VERSION = 1
+HEADER_SIZE = 16
+BOOK_PATH = "opening_book.bin"
+RECORD_DTYPE = np.dtype([("bb_player", "<u8"), ("bb_ai", "<u8"), ("move", "i1"), ("depth", "u1")])
+
+class OpeningBook:
+    """Libro caricato in memoria: canonical_key -> (colonna, profondità)"""
+
+    def __init__(self, moves=None):
+        self.moves = moves if moves is not None else {}
+
+    def __len__(self):
+        return len(self.moves)
+
+    def lookup_bitboards(self, bb_player, bb_ai):
+        key = gl.canonical_key(bb_player, bb_ai)
+        entry = self.moves.get(key)
+        if entry is None:
+            return None
+        col = entry[0]
+        # La mossa è memorizzata per l'orientamento canonico: se la posizione è la speculare va riflessa
+        if key != (bb_player, bb_ai):
+            col = gl.COLUMN_COUNT - 1 - col
+        return col
+
+    def lookup(self, board):
+        bb_player, bb_ai, _ = gl.board_to_bitboard(board)
+        return self.lookup_bitboards(bb_player, bb_ai)
+
+    def save(self, path=BOOK_PATH):
+        records = np.array([(p, a, move, depth) for (p, a), (move, depth) in sorted(self.moves.items())],
+                           dtype=RECORD_DTYPE)
+        with open(path, "wb") as f:
+            f.write((MAGIC + bytes([VERSION])).ljust(HEADER_SIZE, b"\0"))
+            f.write(records.tobytes())
+
+    @classmethod
+    def load(cls, path=BOOK_PATH):
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            if header[:4] != MAGIC or header[4] != VERSION:
+                raise ValueError(f"'{path}' non è un libro delle aperture valido")
+            records = np.frombuffer(f.read(), dtype=RECORD_DTYPE)
+        return cls({(int(r["bb_player"]), int(r["bb_ai"])): (int(r["move"]), int(r["depth"])) for r in records})
+
+_default_book = None
+
+def default_book(path=BOOK_PATH):
+    """Libro condiviso dal processo, caricato alla prima richiesta (vuoto se il file non esiste)"""
+    global _default_book
+    if _default_book is None:
+        _default_book = OpeningBook.load(path) if os.path.exists(path) else OpeningBook()
+    return _default_book
+
+def enumerate_positions(plies):
+    """Posizioni canoniche non terminali con l'AI al tratto entro plies mosse (il giocatore muove per primo)"""
+    frontier = {(0, 0)}
+    ai_to_move = []
+    for ply in range(plies):
+        piece = gl.PLAYER_PIECE if ply % 2 == 0 else gl.AI_PIECE
+        if piece == gl.AI_PIECE:
+            ai_to_move.extend(sorted(frontier))
+        children = set()
+        for bb_player, bb_ai in frontier:
+            pos = gl.Position(bb_player, bb_ai, _heights(bb_player | bb_ai))
+            for col in pos.valid_locations():
+                if not pos.play(col, piece):
+                    children.add(gl.canonical_key(pos.bb_player, pos.bb_ai))
+                pos.undo()
+        frontier = children
+    return ai_to_move
+
+def _heights(mask):
+    return [gl.popcount(mask & gl.COLUMN_MASKS[c]) for c in range(gl.COLUMN_COUNT)]
+
+def _search_book_position(bb_player, bb_ai, depth):
+    import ai_engines as ai
+    board = gl.bitboard_to_board(bb_player, bb_ai)
+    col, _ = ai.minimax(board, depth, -float('inf'), float('inf'), True, tt=ai.TranspositionTable(16))
+    return (bb_player, bb_ai), col
+
+def build_book(plies=4, depth=9, workers=None, path=BOOK_PATH):
+    positions = enumerate_positions(plies)
+    print(f"Libro delle aperture: {len(positions)} posizioni entro {plies} plies, ricerca a profondità {depth}")
+    start = time.perf_counter()
+    book = OpeningBook()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_search_book_position, p, a, depth) for p, a in positions]
+        for i, future in enumerate(futures, 1):
+            key, col = future.result()
+            book.moves[key] = (col, depth)
+            if i % 50 == 0 or i == len(futures):
+                print(f"Cercate {i}/{len(futures)} posizioni ({time.perf_counter() - start:.1f}s)")
+    book.save(path)
+    print(f"Libro salvato come '{path}' ({os.path.getsize(path)} byte)")
+    return book
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costruzione del libro delle aperture per Minimax")
+    parser.add_argument("--plies", type=int, default=4, help="Profondità del libro in semimosse")
+    parser.add_argument("--depth", type=int, default=9, help="Profondità di ricerca per ogni posizione")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=BOOK_PATH)
+    args = parser.parse_args()
+    build_book(args.plies, args.depth, args.workers, args.output)
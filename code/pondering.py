@@ -0,0 +1,90 @@
+import threading
+
+import game_logic as gl
+import ai_engines as ai
+
+# Pondering: mentre il giocatore sceglie la mossa, un thread in background calcola
+# la risposta dell'AI a ciascuna delle (al più 7) mosse possibili. Quando il click
+# arriva la risposta è già pronta, oppure basta attendere la ricerca in corso.
+
+class Ponderer:
+    """Ricerca in background delle risposte dell'AI, una per ogni mossa del giocatore.
+    I risultati sono indicizzati sulla posizione dopo la mossa del giocatore."""
+
+    def __init__(self, think_time, solver_threshold=ai.SOLVER_EMPTY_CELLS, tt_size_mb=16):
+        self.think_time = think_time
+        self.solver_threshold = solver_threshold
+        self.tt = ai.TranspositionTable(tt_size_mb) # Separata da quella della partita: le ricerche possono sovrapporsi
+        self.results = {} # board.tobytes() -> (colonna, SearchStats)
+        self.root = None
+        self.current = None # Posizione in corso di analisi
+        self.hits = 0
+        self.misses = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, board):
+        """Avvia il pondering sulla posizione con il giocatore al tratto (se non è già in corso)"""
+        root = board.tobytes()
+        if root == self.root:
+            return
+        self.stop()
+        self.root = root
+        self.results = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(board.copy(), self._stop), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # La ricerca in corso si interrompe al nodo successivo: il thread viene atteso,
+        # così non compete con la ricerca della mossa vera né con il pondering seguente
+        self._stop.set()
+        with self._cond:
+            self.current = None
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, board, stop):
+        for col in ai.CENTER_PREFERRED_ORDER:
+            if stop.is_set():
+                return
+            if not gl.is_valid_location(board, col):
+                continue
+            row = gl.get_next_open_row(board, col)
+            child = board.copy()
+            gl.drop_piece(child, row, col, gl.PLAYER_PIECE)
+            if gl.winning_move_at(child, row, col): # Partita finita, niente da rispondere
+                continue
+
+            key = child.tobytes()
+            with self._cond:
+                if stop.is_set():
+                    return
+                self.current = key
+            stats = ai.SearchStats()
+            move = ai.get_minimax_move(child, think_time=self.think_time, tt=self.tt, stats=stats,
+                                       solver_threshold=self.solver_threshold, should_stop=stop.is_set)
+            with self._cond:
+                if not stop.is_set():
+                    self.results[key] = (move, stats)
+                    self.current = None
+                self._cond.notify_all()
+
+    def take(self, board):
+        """Risposta già calcolata per board, attendendo se è la ricerca in corso.
+        Restituisce (colonna, SearchStats) oppure None."""
+        key = board.tobytes()
+        with self._cond:
+            if key not in self.results and self.current == key:
+                self._cond.wait_for(lambda: key in self.results or self.current != key,
+                                    timeout=self.think_time)
+            result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            result[1].source = "ponder"
+        return result
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import game_logic as gl
+
+class LabelCache:
+    """Cache delle etichette indicizzata sulla chiave canonica (posizione o sua speculare).
+    Se path è indicato, le etichette vengono caricate da un database SQLite e le nuove
+    vengono salvate con flush(), così restano disponibili tra un'esecuzione e l'altra."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.labels = {}
+        self.new_entries = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with _connect(path) as conn:
+                _create_table(conn)
+                for bb_player, bb_ai, label in conn.execute("SELECT bb_player, bb_ai, label FROM labels"):
+                    self.labels[(bb_player, bb_ai)] = label
+
+    def get(self, bb_player, bb_ai):
+        label = self.labels.get(gl.canonical_key(bb_player, bb_ai))
+        if label is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return label
+
+    def put(self, bb_player, bb_ai, label):
+        key = gl.canonical_key(bb_player, bb_ai)
+        self.labels[key] = label
+        self.new_entries[key] = label
+
+    def merge(self, entries):
+        # Aggiunge etichette calcolate altrove (es. da un altro processo)
+        for key, label in entries:
+            self.labels[key] = label
+            self.new_entries[key] = label
+
+    def take_new_entries(self):
+        entries = list(self.new_entries.items())
+        self.new_entries = {}
+        return entries
+
+    def flush(self):
+        if not self.path or not self.new_entries:
+            self.new_entries = {}
+            return
+        with _connect(self.path) as conn:
+            _create_table(conn)
+            conn.executemany("INSERT OR REPLACE INTO labels VALUES (?, ?, ?)",
+                             [(p, a, label) for (p, a), label in self.new_entries.items()])
+        self.new_entries = {}
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self.labels)
+
+# Stima dell'ingombro di una voce di MoveCache oltre a chiave e valore (nodo dell'OrderedDict)
+_ENTRY_OVERHEAD = 100
+
+class MoveCache:
+    """Cache delle mosse migliori condivisa tra thread (e quindi tra le sessioni dell'app).
+    Chiave: configurazione della ricerca + chiave canonica della posizione; la mossa è
+    salvata nell'orientamento canonico e riflessa in lettura. Le voci meno usate di recente
+    vengono scartate oltre max_bytes. Se path è indicato ogni mossa è salvata anche in un
+    database SQLite, consultato quando la voce non è in memoria."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path:
+            with _connect(path) as conn:
+                _create_moves_table(conn)
+
+    @staticmethod
+    def _key(config, bb_player, bb_ai):
+        key = gl.canonical_key(bb_player, bb_ai)
+        return (config,) + key, key != (bb_player, bb_ai)
+
+    def get(self, config, bb_player, bb_ai):
+        """Mossa salvata per la posizione con la configurazione config, o None"""
+        key, mirrored = self._key(config, bb_player, bb_ai)
+        with self._lock:
+            col = self.entries.get(key)
+            if col is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if col is None and self.path:
+            with _connect(self.path) as conn:
+                row = conn.execute("SELECT col FROM moves WHERE config = ? AND bb_player = ? AND bb_ai = ?",
+                                   key).fetchone()
+            if row is not None:
+                col = row[0]
+                with self._lock:
+                    self.disk_hits += 1
+                    self._insert(key, col)
+        if col is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return gl.COLUMN_COUNT - 1 - col if mirrored else col
+
+    def put(self, config, bb_player, bb_ai, col):
+        key, mirrored = self._key(config, bb_player, bb_ai)
+        col = int(col)
+        if mirrored:
+            col = gl.COLUMN_COUNT - 1 - col
+        with self._lock:
+            self._insert(key, col)
+        if self.path:
+            with _connect(self.path) as conn:
+                conn.execute("INSERT OR REPLACE INTO moves VALUES (?, ?, ?, ?)", key + (col,))
+
+    def _insert(self, key, col):
+        # Da chiamare con il lock acquisito
+        if key in self.entries:
+            self.entries[key] = col
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = col
+        self.size += _entry_size(key)
+        while self.size > self.max_bytes and self.entries:
+            old_key, _ = self.entries.popitem(last=False)
+            self.size -= _entry_size(old_key)
+
+    def get_board(self, config, board):
+        bb_player, bb_ai, _ = gl.board_to_bitboard(board)
+        return self.get(config, bb_player, bb_ai)
+
+    def put_board(self, config, board, col):
+        bb_player, bb_ai, _ = gl.board_to_bitboard(board)
+        self.put(config, bb_player, bb_ai, col)
+
+    def hit_rate(self):
+        total = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / total if total else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+def _entry_size(key):
+    return sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key) + _ENTRY_OVERHEAD
+
+@contextmanager
+def _connect(path):
+    # Connessione SQLite aperta per la sola durata del blocco (commit in uscita): ogni thread usa la propria
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _create_moves_table(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS moves (config TEXT, bb_player INTEGER, bb_ai INTEGER, col INTEGER, "
+                 "PRIMARY KEY (config, bb_player, bb_ai))")
+
+def _create_table(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS labels (bb_player INTEGER, bb_ai INTEGER, label INTEGER, "
+                 "PRIMARY KEY (bb_player, bb_ai))")
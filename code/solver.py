@@ -0,0 +1,158 @@
+import time
+
+import game_logic as gl
+
+# Risolutore esatto per i finali: negamax con finestra nulla (ricerca per bisezione
+# sul valore, stile MTD(f)) e tabella di trasposizione propria. Lavora direttamente
+# sui bitboard: own sono le pedine di chi muove, mask tutte le pedine.
+# Punteggio dal punto di vista di chi muove: positivo se vince (più è alto, prima
+# vince), 0 per il pareggio, negativo se perde.
+CELLS = gl.ROW_COUNT * gl.COLUMN_COUNT
+BOTTOM_MASK = sum(1 << (c * gl.BB_HEIGHT) for c in range(gl.COLUMN_COUNT))
+ORDER = [3, 2, 4, 1, 5, 0, 6]
+
+def win_score(stones):
+    # Vittoria con la prossima pedina, quando sul tavolo ce ne sono stones
+    return (CELLS + 1 - stones) // 2
+
+class Solver:
+    """Risolutore con la propria tabella (chiave own + mask -> (limite inferiore, superiore)).
+    La tabella viene svuotata quando supera max_entries voci."""
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self.table = {}
+        self.nodes = 0
+
+    def clear(self):
+        self.table = {}
+
+    def solve(self, own, mask):
+        """Valore esatto della posizione per chi muove"""
+        stones = gl.popcount(mask)
+        possible = (mask + BOTTOM_MASK) & gl.BOARD_MASK
+        if gl.bb_winning_cells(own, mask) & possible:
+            return win_score(stones)
+
+        # Bisezione con finestre nulle: ogni ricerca dice solo se il valore è sopra o sotto med
+        low = -((CELLS - stones) // 2)
+        high = (CELLS + 1 - stones) // 2
+        while low < high:
+            med = low + (high - low) // 2
+            if med <= 0 and int(low / 2) < med:
+                med = int(low / 2)
+            elif med >= 0 and int(high / 2) > med:
+                med = int(high / 2)
+            value = self._negamax(own, mask, stones, med, med + 1)
+            if value <= med:
+                high = value
+            else:
+                low = value
+        return low
+
+    def _negamax(self, own, mask, stones, alpha, beta):
+        # Chi muove non può vincere subito (garantito dal chiamante)
+        self.nodes += 1
+        opp = own ^ mask
+        possible = (mask + BOTTOM_MASK) & gl.BOARD_MASK
+        opp_wins = gl.bb_winning_cells(opp, mask)
+        forced = possible & opp_wins
+        if forced:
+            if forced & (forced - 1): # Due minacce: non si possono parare entrambe
+                return -((CELLS - stones) // 2)
+            possible = forced
+        possible &= ~(opp_wins >> 1) # Mai giocare sotto una casella vincente dell'avversario
+        if not possible:
+            return -((CELLS - stones) // 2)
+        if stones >= CELLS - 2: # Restano due pedine e nessuno può vincere
+            return 0
+
+        low = -((CELLS - 2 - stones) // 2)
+        high = (CELLS - 1 - stones) // 2
+        key = own + mask
+        bounds = self.table.get(key)
+        if bounds is not None:
+            low = max(low, bounds[0])
+            high = min(high, bounds[1])
+        if alpha < low:
+            alpha = low
+            if alpha >= beta:
+                return alpha
+        if beta > high:
+            beta = high
+            if alpha >= beta:
+                return beta
+
+        # Prima le mosse che creano più minacce, a parità il centro
+        moves = []
+        for col in ORDER:
+            move = possible & gl.COLUMN_MASKS[col]
+            if move:
+                threats = gl.popcount(gl.bb_winning_cells(own | move, mask | move) & ~(mask | move))
+                moves.append((threats, move))
+        moves.sort(key=lambda m: m[0], reverse=True)
+
+        for _, move in moves:
+            value = -self._negamax(opp, mask | move, stones + 1, -beta, -alpha)
+            if value >= beta:
+                self._store(key, value, bounds[1] if bounds else high)
+                return value
+            if value > alpha:
+                alpha = value
+
+        self._store(key, bounds[0] if bounds else low, alpha)
+        return alpha
+
+    def _store(self, key, low, high):
+        if len(self.table) >= self.max_entries:
+            self.table = {}
+        self.table[key] = (low, high)
+
+    def best_move(self, own, mask):
+        """(colonna, valore) migliori per chi muove; a parità vince l'ordine centro-prima"""
+        stones = gl.popcount(mask)
+        possible = (mask + BOTTOM_MASK) & gl.BOARD_MASK
+        wins = gl.bb_winning_cells(own, mask) & possible
+        best_col, best_value = None, -float('inf')
+        for col in ORDER:
+            move = possible & gl.COLUMN_MASKS[col]
+            if not move:
+                continue
+            if wins & move:
+                return col, win_score(stones)
+            value = -self.solve(own ^ mask, mask | move) if stones + 1 < CELLS else 0
+            if value > best_value:
+                best_col, best_value = col, value
+        return best_col, best_value
+
+def board_bitboards(board, piece):
+    """(own, mask) di una board numpy con piece al tratto"""
+    bb_player, bb_ai, _ = gl.board_to_bitboard(board)
+    own = bb_ai if piece == gl.AI_PIECE else bb_player
+    return own, bb_player | bb_ai
+
+def solve_board(board, piece, solver=None):
+    """Valore esatto di board per piece al tratto (positivo: piece vince)"""
+    solver = solver or Solver()
+    return solver.solve(*board_bitboards(board, piece))
+
+def solver_move(board, piece=gl.AI_PIECE, solver=None, stats=None):
+    """Mossa perfetta per piece; con stats registra nodi e tempo della risoluzione"""
+    solver = solver or Solver()
+    start = time.perf_counter()
+    nodes = solver.nodes
+    col, value = solver.best_move(*board_bitboards(board, piece))
+    if stats is not None:
+        stats.source = "solver"
+        stats.nodes += solver.nodes - nodes
+        stats.elapsed += time.perf_counter() - start
+    return col, value
+
+_default_solver = None
+
+def default_solver():
+    """Risolutore condiviso dal processo: la tabella resta valida tra una mossa e l'altra"""
+    global _default_solver
+    if _default_solver is None:
+        _default_solver = Solver()
+    return _default_solver
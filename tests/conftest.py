@@ -0,0 +1,5 @@
+import os
+import sys
+
+# I moduli del progetto si importano dalla cartella code, come quando si lancia l'app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
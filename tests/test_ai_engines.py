@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+import game_logic as gl
+import ai_engines as ai
+
+@pytest.mark.parametrize("piece", [gl.AI_PIECE, gl.PLAYER_PIECE])
+@pytest.mark.parametrize("window_count", [len(gl.WINDOWS), gl.ROW_WINDOW_COUNT])
+def test_eval_position_matches_score_bitboard(piece, window_count):
+    # Il punteggio incrementale deve restare uguale a quello ricalcolato, dopo play e undo
+    rng = random.Random(0)
+    for _ in range(50):
+        pos = ai.EvalPosition(piece=piece, window_count=window_count)
+        history = []
+        for _ in range(rng.randrange(1, 30)):
+            cols = pos.valid_locations()
+            if not cols:
+                break
+            pos.play(rng.choice(cols), gl.AI_PIECE if len(pos.moves) % 2 else gl.PLAYER_PIECE)
+            history.append(pos.score)
+            own, opp = (pos.bb_ai, pos.bb_player) if piece == gl.AI_PIECE else (pos.bb_player, pos.bb_ai)
+            assert pos.score == ai.score_bitboard(own, opp, gl.WINDOW_MASKS[:window_count])
+        while history:
+            assert pos.score == history.pop()
+            pos.undo()
+        assert pos.score == 0
+
+@pytest.mark.parametrize("piece", [gl.AI_PIECE, gl.PLAYER_PIECE])
+def test_score_positions_matches_score_position(piece):
+    rng = random.Random(1)
+    boards = []
+    for _ in range(40):
+        board = gl.create_board()
+        for i in range(rng.randrange(0, 30)):
+            cols = gl.get_valid_locations(board)
+            col = rng.choice(cols)
+            gl.drop_piece(board, gl.get_next_open_row(board, col), col, gl.PLAYER_PIECE if i % 2 == 0 else gl.AI_PIECE)
+        boards.append(board)
+    expected = [ai.score_position(board, piece) for board in boards]
+    assert ai.score_positions(boards, piece).tolist() == expected
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import dataset_io as dio
+import model_store as ms
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    boards = rng.integers(-1, 2, size=(600, dio.CELLS))
+    labels = rng.integers(-1, 2, size=(600, 1))
+    path = str(tmp_path / "dataset.c4b")
+    with dio.DatasetWriter(path) as writer:
+        writer.write_rows(np.hstack([boards, labels]))
+    return path
+
+def train_and_save(path, streaming, models_dir):
+    # Come analysis_mlp.py con --streaming / --in-memory
+    if streaming:
+        model, history = ms.train_streaming(path, verbose=False)
+        metadata = ms.streaming_metadata(model, history, path)
+    else:
+        X, y = dio.load_xy(path)
+        model, X_train, X_test, _, y_test = ms.train(X, y)
+        metadata = ms.evaluation_metadata(model, X_train, X_test, y_test, path)
+    ms.save_model(model, ms.artifact_key(path, ms.training_params(streaming)), metadata, models_dir)
+
+@pytest.mark.parametrize("auto_streaming", [False, True])
+def test_forced_mode_model_is_found(dataset, tmp_path, monkeypatch, auto_streaming):
+    if auto_streaming:
+        monkeypatch.setattr(ms, "STREAMING_MIN_ROWS", 1)
+    forced = not ms.use_streaming(dataset)
+    assert forced != auto_streaming
+
+    models_dir = str(tmp_path / "models")
+    train_and_save(dataset, forced, models_dir)
+
+    assert ms.load_trained(dataset, models_dir) is not None
+    # load_or_train deve restituire l'artefatto esistente invece di riaddestrare
+    monkeypatch.setattr(ms, "train", lambda *a: pytest.fail("riaddestramento inatteso"))
+    monkeypatch.setattr(ms, "train_streaming", lambda *a, **k: pytest.fail("riaddestramento inatteso"))
+    _, metadata = ms.load_or_train(dataset, models_dir)
+    assert ("epochs" in metadata) == forced
+
+def test_missing_artifact(dataset, tmp_path):
+    assert ms.load_trained(dataset, str(tmp_path / "models")) is None
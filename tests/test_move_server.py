@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+import game_logic as gl
+import move_server as srv
+
+def board_with(moves):
+    # Mosse alternate a partire dal Player
+    board = gl.create_board()
+    piece = gl.PLAYER_PIECE
+    for col in moves:
+        gl.drop_piece(board, gl.get_next_open_row(board, col), col, piece)
+        piece *= -1
+    return board.tolist()
+
+def handle(data):
+    server = srv.MoveServer(workers=1)
+    try:
+        return asyncio.run(server.handle_move(data))
+    finally:
+        server.pool.shutdown()
+
+@pytest.mark.parametrize("board, message", [
+    (board_with([0, 1, 0, 1, 0, 1, 0]), "conclusa"), # Quattro in fila verticale del Player
+    (board_with([0, 1, 0, 1, 0, 1, 2, 1]), "conclusa"), # Quattro in fila dell'AI
+    ([[1, 1, 0, 0, 0, 0, 0]] + [[0] * 7] * 5, "pedine"), # Due pedine del Player, nessuna dell'AI
+    ([[0] * 7, [1] + [0] * 6] + [[0] * 7] * 4, "sospesa"),
+    ([[0, 1], [2]], "matrice"),
+    ("abc", "matrice"),
+])
+def test_invalid_boards_are_rejected(board, message):
+    with pytest.raises(srv.RequestError, match=message) as error:
+        srv.parse_board({"board": board})
+    assert error.value.status == 400
+
+@pytest.mark.parametrize("name", ["budget_ms", "think_time_ms"])
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), 0, -100, "x"])
+def test_invalid_durations_are_rejected(name, value):
+    with pytest.raises(srv.RequestError) as error:
+        handle({"board": board_with([3]), "engine": "minimax", name: value})
+    assert error.value.status == 400
+
+def test_valid_request_returns_a_move():
+    response = handle({"board": board_with([3]), "engine": "minimax", "think_time_ms": 50, "budget_ms": 2000})
+    assert response["move"] in range(gl.COLUMN_COUNT)